@@ -0,0 +1,109 @@
+'''Find mailing addresses that are probably the same place written in slightly different ways'''
+
+import re
+from random import Random
+from zlib import crc32
+
+
+# addresses whose character n-grams overlap at least this much are considered the same place
+SIMILARITY_THRESHOLD = 0.7
+NGRAM_SIZE = 3
+# MinHash signatures are split into bands, and addresses that agree on every value of
+# any one band become candidates. More bands (or fewer rows per band) find more
+# candidates at the cost of comparing more pairs.
+NUM_BANDS = 6
+ROWS_PER_BAND = 2
+# buckets this large are made up of very common n-grams rather than near-duplicates,
+# so they are skipped to keep the number of comparisons linear
+MAX_BUCKET_SIZE = 100
+
+_HASH_PRIME = 4294967311
+_random = Random(7)
+_MINHASH_COEFFICIENTS = [
+    (_random.randrange(1, _HASH_PRIME), _random.randrange(0, _HASH_PRIME))
+    for _ in range(NUM_BANDS * ROWS_PER_BAND)
+]
+_NON_ALPHANUMERIC = re.compile(r'[^0-9a-z]+')
+_NUMBER = re.compile(r'\d+')
+
+
+def normalize_address(address):
+    '''Fold case, punctuation and whitespace so that formatting differences are ignored.'''
+    return _NON_ALPHANUMERIC.sub(' ', address.casefold()).strip()
+
+
+def address_ngrams(normalized_address):
+    if len(normalized_address) <= NGRAM_SIZE:
+        return {normalized_address}
+    return {normalized_address[i:i + NGRAM_SIZE] for i in range(len(normalized_address) - NGRAM_SIZE + 1)}
+
+
+def minhash_signature(ngrams, ngram_hashes):
+    '''MinHash signature of a set of n-grams, caching the hash values of each n-gram in ngram_hashes.'''
+    for n in ngrams - ngram_hashes.keys():
+        h = crc32(n.encode())
+        ngram_hashes[n] = tuple([(a * h + b) % _HASH_PRIME for a, b in _MINHASH_COEFFICIENTS])
+    return list(map(min, zip(*map(ngram_hashes.__getitem__, ngrams))))
+
+
+def numbers_are_compatible(numbers1, numbers2):
+    # '12 Oak St' and '14 Oak St' are neighbors rather than typos, but an address
+    # may be missing an apartment number that the other one has
+    return numbers1 <= numbers2 or numbers2 <= numbers1
+
+
+def find_address_clusters(addresses, threshold=SIMILARITY_THRESHOLD):
+    '''Group addresses that look like the same place.
+
+    Candidates are found with locality sensitive hashing over MinHash signatures of each
+    address's character n-grams, so the work grows roughly linearly with the number of
+    addresses instead of comparing every pair. Only groups with more than one distinct
+    address are returned, each sorted, in sorted order.
+    '''
+    addresses = sorted(set(addresses))
+    normalized_addresses = [normalize_address(a) for a in addresses]
+    ngrams = [address_ngrams(a) for a in normalized_addresses]
+    numbers = [frozenset(_NUMBER.findall(a)) for a in normalized_addresses]
+
+    # bucket addresses by each band of their signature. The house number is part of
+    # the key so that the many addresses sharing a city, state and zip code don't all
+    # end up in the same buckets.
+    buckets = {}
+    ngram_hashes = {}
+    for i, (normalized_address, address_ngram_set) in enumerate(zip(normalized_addresses, ngrams)):
+        house_number = _NUMBER.search(normalized_address)
+        house_number = house_number.group() if house_number else ''
+        signature = minhash_signature(address_ngram_set, ngram_hashes)
+        for band in range(NUM_BANDS):
+            band_values = tuple(signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND])
+            buckets.setdefault((band, house_number, band_values), []).append(i)
+
+    # union-find over candidate pairs that turn out to be similar enough
+    parents = list(range(len(addresses)))
+
+    def find(i):
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+
+    compared_pairs = set()
+    for members in buckets.values():
+        if len(members) < 2 or len(members) > MAX_BUCKET_SIZE:
+            continue
+        for x, i in enumerate(members):
+            for j in members[x + 1:]:
+                if (i, j) in compared_pairs:
+                    continue
+                compared_pairs.add((i, j))
+                root_i, root_j = find(i), find(j)
+                if root_i == root_j or not numbers_are_compatible(numbers[i], numbers[j]):
+                    continue
+                similarity = len(ngrams[i] & ngrams[j]) / len(ngrams[i] | ngrams[j])
+                if similarity >= threshold:
+                    parents[max(root_i, root_j)] = min(root_i, root_j)
+
+    clusters = {}
+    for i, address in enumerate(addresses):
+        clusters.setdefault(find(i), []).append(address)
+    return [c for c in clusters.values() if len(c) > 1]
@@ -0,0 +1,71 @@
+'''Benchmark finding customers with packages going to more than one mailing address, comparing
+the old pairwise scan with find_duplicate_name_packages from process_shipment_v7.py'''
+
+import random
+import sys
+import time
+from os import path
+import click
+
+sys.path.insert(0, path.dirname(path.dirname(path.realpath(__file__))))
+from process_shipment_v7 import Package, find_duplicate_name_packages
+
+
+def legacy_find_duplicate_name_packages(sorted_packages):
+    '''The O(n^2) scan that main() used before the name index was introduced.'''
+    duplicate_name_packages = {}
+    for i in sorted_packages:
+        for j in sorted_packages:
+            if i.customer_name == j.customer_name and i.mailing_address != j.mailing_address:
+                if duplicate_name_packages.get(i.customer_name):
+                    duplicate_name_packages[i.customer_name].extend([i.mailing_address, j.mailing_address])
+                else:
+                    duplicate_name_packages[i.customer_name] = [i.mailing_address, j.mailing_address]
+    for name in duplicate_name_packages.keys():
+        duplicate_name_packages[name] = list(set(duplicate_name_packages[name]))
+    return duplicate_name_packages
+
+
+def synthetic_packages(num_packages, seed=0):
+    '''Packages where roughly 1 in 20 customers has ordered to more than one address.'''
+    rng = random.Random(seed)
+    packages = []
+    for i in range(num_packages):
+        customer = rng.randrange(num_packages)
+        package = Package()
+        package.customer_name = f'Customer {customer}'
+        address_number = customer if rng.random() > 0.05 else rng.randrange(num_packages)
+        package.mailing_address = f'{address_number} Main St\nAnn Arbor, MI 48103'
+        packages.append(package)
+    return packages
+
+
+def as_sets(duplicate_name_packages):
+    return {name: set(addresses) for name, addresses in duplicate_name_packages.items()}
+
+
+@click.command()
+@click.option('--sizes', default='1000,10000,100000', show_default=True, help="comma separated numbers of packages")
+@click.option('--legacy-limit', default=10000, show_default=True, help="largest size to also run the O(n^2) scan on")
+def main(sizes, legacy_limit):
+    print(f"{'packages':>10}{'legacy (s)':>14}{'name index (s)':>16}{'speedup':>10}")
+    for size in [int(s) for s in sizes.split(',')]:
+        packages = synthetic_packages(size)
+
+        start = time.perf_counter()
+        duplicates = find_duplicate_name_packages(packages)
+        index_time = time.perf_counter() - start
+
+        if size <= legacy_limit:
+            start = time.perf_counter()
+            legacy_duplicates = legacy_find_duplicate_name_packages(packages)
+            legacy_time = time.perf_counter() - start
+            if as_sets(legacy_duplicates) != as_sets(duplicates) or list(legacy_duplicates) != list(duplicates):
+                raise Exception(f'name index results differ from the pairwise scan for {size} packages')
+            print(f"{size:>10}{legacy_time:>14.3f}{index_time:>16.4f}{legacy_time / index_time:>9.0f}x")
+        else:
+            print(f"{size:>10}{'skipped':>14}{index_time:>16.4f}{'':>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+'''Benchmark classifying the orders on legacy paypal receipts, comparing the chains of `in`
+checks from old_versions/process_orders.py and old_versions/process_shipment_v3.py with the
+classifiers that receipt_formats.py parses v1 and v2 receipts with'''
+
+import random
+import sys
+import time
+from os import path
+import click
+
+sys.path.insert(0, path.dirname(path.dirname(path.realpath(__file__))))
+from legacy_receipts import SHIPMENT_CLASSIFIER, V1_CLASSIFIER
+from paypal_receipts import order_spans
+
+
+PRODUCT_LINES = [
+    ("American Cent Laminated Placemat", "Buy 1 Placemat", '$15.00'),
+    ("American Cent Laminated Placemat", "Buy 2 Small Cent Placemats", '$25.00'),
+    ("American Nickel Laminated Placemat", "Buy 1 Nickel Placemat", '$15.00'),
+    ("American Nickel Laminated Placemat", "Buy 2 Nickel Placemats", '$25.00'),
+    ("Coin Roll Hunting Placemats", "1 Small Cent + 1 Nickel Placemat", '$25.00'),
+    ("Silver Stacking Placemat", "Buy 1 Silver Stacking Placemat", '$15.00'),
+    ("Silver Stacking Placemat", "Buy 2 Silver Stacking Placemats", '$25.00'),
+    ("Silver Stacking Placemat", "1 silver stacking placemat", '$15.00'),
+    ("Placemat Variety Pack", "1 of each placemat", '$40.00'),
+    ("Quin's Coins Hat", "Buy 2 Quin's Coins Hats", '$49.98'),
+    ("Quin's Coins Sticker", "Buy 1 Sticker", '$3.00'),
+]
+CITIES = [
+    ('Corona, CA 92882', 'United States'),
+    ('San Juan, PR 00901', 'Puerto Rico'),
+    ('courtenay BC V9J 1R7', 'Canada'),
+]
+TERMS = ("Payments are processed by PayPal. Placemats ship within 3 business days and hats ship "
+         "separately. Please contact quinscoins@gmail.com with any questions about this order.\n")
+
+
+def synthetic_shipment_receipt(rng, i):
+    '''Text of a receipt in the layout read by process_shipment_v2.py and _v3.py (v2).'''
+    description, option, price = rng.choice(PRODUCT_LINES)
+    city, country = rng.choice(CITIES)
+    return '\n'.join([
+        "Quinlan Productions LLC".ljust(70) + f"Invoice #: {i:06d}",
+        "quinscoins@gmail.com".ljust(70) + "Invoice date: Jan 1, 2021",
+        "Ship to",
+        f"CUSTOMER {i}",
+        "Ship from",
+        "Quinlan Productions LLC",
+        f"customer{i}@example.com     quinscoins@gmail.com",
+        "Address     PO Box 131165",
+        f"{rng.randint(1, 9999)} Main St".ljust(44) + "Ann Arbor, MI 48113",
+        city.ljust(44) + "United States",
+        country,
+        f"Transaction ID     {i:012d}",
+        "Item Description".ljust(45) + "Quantity     Price     Amount",
+        description,
+        option.ljust(45) + f"1            {price}     {price}",
+        TERMS * 3,
+    ])
+
+
+def synthetic_process_orders_receipt(rng, i):
+    '''Text of a receipt in the layout read by process_orders.py and process_shipment.py (v1), sometimes only showing the amount paid.'''
+    if rng.random() < 0.3:
+        description, option = rng.choice(['payment for a small cent placemat', 'Nickel placemat', 'thanks!']), ''
+        price = rng.choice(['$15.00', '$25.00', '$30.00'])
+    else:
+        description, option, price = rng.choice(PRODUCT_LINES)
+    city, country = rng.choice(CITIES)
+    return '\n'.join([
+        "Quinlan Productions LLC".ljust(70) + f"Invoice #: {i:06d}",
+        "Ship to:",
+        f"CUSTOMER {i}",
+        "Ship from:",
+        "Quinlan Productions LLC",
+        f"customer{i}@example.com     quinscoins@gmail.com",
+        "Address:",
+        f"{rng.randint(1, 9999)} Main St",
+        city,
+        country,
+        description,
+        option.ljust(45) + f"1            {price}     {price}",
+        TERMS * 3,
+    ])
+
+
+def legacy_shipment_order_code(order):
+    '''The checks from process_shipment_v3.py, on the text of a single order.'''
+    if "American Cent Laminated Placemat" in order and ("Buy 1 Placemat" in order or "Buy 1 Small Cent Placemat" in order):
+        return 'P1'
+    elif "American Cent Laminated Placemat" in order and ("Buy 2 Placemats" in order or "Buy 2 Small Cent Placemats" in order):
+        return 'P2'
+    elif "American Nickel Laminated Placemat" in order and "Buy 1 Nickel Placemat" in order:
+        return 'N1'
+    elif "American Nickel Laminated Placemat" in order and "Buy 2 Nickel Placemats" in order:
+        return 'N2'
+    elif "1 Small Cent + 1 Nickel Placemat" in order:
+        return 'P1N1'
+    elif "Silver Stacking Placemat" in order and "Buy 1 Silver Stacking Placemat" in order:
+        return 'S1'
+    elif "Silver Stacking Placemat" in order and "Buy 2 Silver Stacking Placemats" in order:
+        return 'S2'
+    elif "Placemat Variety Pack" in order:
+        return 'P1N1S1'
+    elif "Quin's Coins Hat" in order and "Buy 1 Quin's Coins Hat" in order:
+        return 'H1'
+    elif "Quin's Coins Hat" in order and "Buy 2 Quin's Coins Hats" in order:
+        return 'H2'
+    return None
+
+
+def legacy_v1_order_code(order):
+    '''The checks from process_shipment_v3.py, then the looser checks from process_orders.py
+    that they replaced, on the text of a single order.'''
+    order_code = legacy_shipment_order_code(order)
+    if order_code is not None:
+        return order_code
+    if "Silver Stacking Placemat" in order:
+        return 'S1'
+    elif "$15" in order:
+        return None if "nickel" in order or "Nickel" in order else "P1"
+    elif "$25" in order:
+        return None if "nickel" in order or "Nickel" in order else "P2"
+    elif "$30" in order and "small cent" in order:
+        return "P3"
+    elif "$30" in order and "nickel" in order:
+        return "N3"
+    return None
+
+
+def time_classify(classify, orders):
+    start = time.perf_counter()
+    results = [classify(order) for order in orders]
+    return time.perf_counter() - start, results
+
+
+@click.command()
+@click.option('--receipts', '-n', default=50000, show_default=True, help="number of synthetic receipts of each layout to classify")
+def main(receipts):
+    rng = random.Random(0)
+    # (format, synthetic receipt, marker that orders are split on, chain of checks, classifier)
+    layouts = [
+        ('v2', synthetic_shipment_receipt, 'Ship to', legacy_shipment_order_code, SHIPMENT_CLASSIFIER),
+        ('v1', synthetic_process_orders_receipt, 'Ship to:', legacy_v1_order_code, V1_CLASSIFIER),
+    ]
+    print(f"{'':<24}{'checks (s)':>12}{'rules (s)':>12}{'us/order':>12}{'speedup':>10}")
+    for label, synthetic_receipt, marker, legacy_order_code, classifier in layouts:
+        # each order is classified on its own, the way receipt_formats.py does
+        orders = []
+        for i in range(receipts):
+            text = synthetic_receipt(rng, i)
+            orders.extend(text[start:end] for start, end in order_spans(text, marker))
+        legacy_time, legacy_results = time_classify(legacy_order_code, orders)
+        new_time, new_results = time_classify(classifier.order_code, orders)
+        if legacy_results != new_results:
+            raise Exception('the %s classifier disagrees with the chain of checks' % label)
+        print(f"{label:<24}{legacy_time:>12.3f}{new_time:>12.3f}{new_time / len(orders) * 1e6:>12.2f}{legacy_time / new_time:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+'''Benchmark adding up order totals and paypal fees in integer cents against the per-order
+Decimal arithmetic of process_shipment_v6.py, checking that both always agree to the cent'''
+
+import random
+import sys
+import time
+from decimal import Decimal, ROUND_HALF_UP
+from os import path
+import click
+
+sys.path.insert(0, path.dirname(path.dirname(path.realpath(__file__))))
+from money import paypal_fee_cents, parse_cents, total_paypal_fee_cents
+
+
+def legacy_paypal_fees(retail_price):
+    '''The paypal fee calculation from process_shipment_v6.py.'''
+    paypal_variable_fees_cents = Decimal(str(Decimal(0.0349) * retail_price * 100))
+    return Decimal(str((49 + paypal_variable_fees_cents) / 100)).quantize(Decimal('.01'), rounding=ROUND_HALF_UP)
+
+
+def legacy_totals(totals):
+    '''(revenue, paypal fees) of orders with the given totals, building a Decimal for each order.'''
+    revenue = Decimal(0)
+    fees = Decimal(0)
+    for total in totals:
+        retail_price = Decimal(total)
+        revenue += retail_price
+        fees += legacy_paypal_fees(retail_price)
+    return revenue, fees
+
+
+def cents_totals(totals):
+    '''(revenue, paypal fees) in cents of orders with the given totals.'''
+    prices_cents = [parse_cents(total) for total in totals]
+    return sum(prices_cents), total_paypal_fee_cents(prices_cents)
+
+
+def check_against_decimal(rng, num_random_prices, max_exhaustive_cents):
+    '''Raise if the cents functions ever disagree with the Decimal ones.
+
+    Every price up to max_exhaustive_cents is checked (which covers every way that 3.49%
+    of a price can fall around half a cent), along with random prices up to $1,000,000.
+    '''
+    prices_cents = list(range(max_exhaustive_cents + 1)) + [rng.randrange(100000000) for _ in range(num_random_prices)]
+    for price_cents in prices_cents:
+        expected = legacy_paypal_fees(Decimal(price_cents) / 100) * 100
+        if paypal_fee_cents(price_cents) != expected:
+            raise Exception(f'paypal fee of {price_cents} cents is {paypal_fee_cents(price_cents)} cents, not {expected}')
+    if total_paypal_fee_cents(prices_cents) != sum(paypal_fee_cents(p) for p in prices_cents):
+        raise Exception('total_paypal_fee_cents differs from adding up paypal_fee_cents')
+
+    for _ in range(num_random_prices):
+        text = f'{rng.randrange(100000)}.{rng.randrange(100):0{rng.choice([1, 2])}d}' if rng.random() < 0.9 else str(rng.randrange(1000))
+        if parse_cents(text) != int(Decimal(text) * 100):
+            raise Exception(f'parse_cents({text!r}) is {parse_cents(text)}, not {int(Decimal(text) * 100)}')
+    return len(prices_cents)
+
+
+@click.command()
+@click.option('--orders', '-n', default=1000000, show_default=True, help="number of synthetic order totals to add up")
+@click.option('--checks', default=200000, show_default=True, help="number of random prices to check against the Decimal code")
+def main(orders, checks):
+    rng = random.Random(0)
+    num_checked = check_against_decimal(rng, checks, 100000)
+    print(f"cents and Decimal agree on {num_checked} prices\n")
+
+    totals = [f'{rng.choice([15, 15, 25, 30, 40, 24.99, 49.98, 54.99]) * rng.choice([1, 1, 2]):.2f}' for _ in range(orders)]
+    start = time.perf_counter()
+    legacy_revenue, legacy_fees = legacy_totals(totals)
+    legacy_time = time.perf_counter() - start
+    start = time.perf_counter()
+    revenue_cents, fee_cents = cents_totals(totals)
+    cents_time = time.perf_counter() - start
+    if legacy_revenue * 100 != revenue_cents or legacy_fees * 100 != fee_cents:
+        raise Exception('the cents totals differ from the Decimal totals')
+
+    print(f"{orders} orders: revenue ${legacy_revenue:,.2f}, paypal fees ${legacy_fees:,.2f}\n")
+    print(f"{'':<24}{'time (s)':>12}{'orders/s':>14}")
+    for label, elapsed in [('Decimal', legacy_time), ('cents', cents_time)]:
+        print(f"{label:<24}{elapsed:>12.3f}{orders / elapsed:>14,.0f}")
+    print(f"\nspeedup: {legacy_time / cents_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+'''Benchmark splitting the products going to each address into hat and placemat packages,
+comparing the old deepcopy-based code with split_package from process_shipment_v7.py'''
+
+import random
+import sys
+import time
+from copy import deepcopy
+from os import path
+import click
+
+sys.path.insert(0, path.dirname(path.dirname(path.realpath(__file__))))
+from process_shipment_v7 import Package, split_package, NUM_PLACEMATS_TO_SHIPPING_COST_CENTS, SINGLE_HAT_SHIPPING_COST_USA_CENTS
+
+
+# the shipping costs in dollars, as they were before they were kept in cents
+SINGLE_HAT_SHIPPING_COST_USA = SINGLE_HAT_SHIPPING_COST_USA_CENTS / 100
+NUM_PLACEMATS_TO_SHIPPING_COST = {
+    country: {n: cents / 100 for n, cents in costs.items()}
+    for country, costs in NUM_PLACEMATS_TO_SHIPPING_COST_CENTS.items()
+}
+
+
+class LegacyPackage():
+    '''The Package class from before it was slotted.'''
+    order_code = None
+    num_penny_placemats = 0
+    num_nickel_placemats = 0
+    num_silver_stacking_placemats = 0
+    num_dollar_coin_placemats = 0
+    num_hats = 0
+    num_total_placemats = 0
+    customer_name = None
+    email_address = None
+    mailing_address = None
+    country = None
+    shipping_cost = 0
+    shipping_class = None
+    is_shop_order = False
+
+
+def legacy_split_package(package):
+    '''The deepcopy-based splitting that main() used to do for every address.'''
+    packages = []
+    package.num_total_placemats = package.num_penny_placemats + package.num_nickel_placemats + package.num_silver_stacking_placemats + package.num_dollar_coin_placemats
+    if package.num_hats > 0:
+        hat_package = deepcopy(package)
+        hat_package.num_penny_placemats = 0
+        hat_package.num_nickel_placemats = 0
+        hat_package.num_silver_stacking_placemats = 0
+        hat_package.num_dollar_coin_placemats = 0
+        hat_package.num_total_placemats = 0
+        hat_package.order_code = 'H1'
+        hat_package.shipping_cost = SINGLE_HAT_SHIPPING_COST_USA
+        num_hats = hat_package.num_hats
+        hat_package.num_hats = 1
+        for i in range(num_hats):
+            packages.append(hat_package)
+    if package.num_total_placemats > 0:
+        placemat_package = deepcopy(package)
+        placemat_package.num_hats = 0
+        placemat_package.shipping_cost = NUM_PLACEMATS_TO_SHIPPING_COST.get(placemat_package.country, {}).get(str(placemat_package.num_total_placemats))
+        placemat_package.order_code = '%s%s%s%s' % (
+            ('P' + str(placemat_package.num_penny_placemats)) if placemat_package.num_penny_placemats else '',
+            ('N' + str(placemat_package.num_nickel_placemats)) if placemat_package.num_nickel_placemats else '',
+            ('S' + str(placemat_package.num_silver_stacking_placemats)) if placemat_package.num_silver_stacking_placemats else '',
+            ('D' + str(placemat_package.num_dollar_coin_placemats)) if placemat_package.num_dollar_coin_placemats else '',
+        )
+        if (not placemat_package.is_shop_order) and \
+           placemat_package.num_total_placemats < 5 or \
+           (placemat_package.num_total_placemats == 5 and placemat_package.country == 'CA'):
+            placemat_package.shipping_class = 'first_class'
+        else:
+            placemat_package.shipping_class = 'priority'
+            placemat_package.shipping_cost = 10.00
+        packages.append(placemat_package)
+    return packages
+
+
+def synthetic_packages(package_class, num_addresses, seed=0):
+    '''One unsplit package per address, with hats in about a quarter of them.'''
+    rng = random.Random(seed)
+    packages = []
+    for i in range(num_addresses):
+        package = package_class()
+        package.customer_name = f'Customer {i}'
+        package.email_address = f'customer{i}@example.com'
+        package.mailing_address = f'{i} Main St\nAnn Arbor, MI 48103'
+        package.country = 'US'
+        package.num_penny_placemats = rng.choice([0, 1, 1, 2])
+        package.num_nickel_placemats = rng.choice([0, 0, 1])
+        package.num_silver_stacking_placemats = rng.choice([0, 0, 1])
+        package.num_hats = rng.choice([0, 0, 0, 1])
+        if not package.num_penny_placemats + package.num_nickel_placemats + package.num_silver_stacking_placemats:
+            package.num_hats = 1
+        packages.append(package)
+    return packages
+
+
+def time_split(split, packages):
+    start = time.perf_counter()
+    split_packages = [p for package in packages for p in split(package)]
+    return time.perf_counter() - start, split_packages
+
+
+@click.command()
+@click.option('--addresses', '-n', default=100000, show_default=True, help="number of synthetic addresses to split")
+def main(addresses):
+    legacy_time, legacy_packages = time_split(legacy_split_package, synthetic_packages(LegacyPackage, addresses))
+    new_time, new_packages = time_split(split_package, synthetic_packages(Package, addresses))
+
+    summarize = lambda packages, cost: [(p.order_code, cost(p), p.shipping_class, p.num_hats) for p in packages]
+    if summarize(legacy_packages, lambda p: round(p.shipping_cost * 100)) != summarize(new_packages, lambda p: p.shipping_cost_cents):
+        raise Exception('split_package produced different packages than the deepcopy-based code')
+
+    print(f"{addresses} addresses split into {len(new_packages)} packages\n")
+    print(f"{'':<24}{'time (s)':>12}{'us/package':>12}")
+    for label, elapsed in [('deepcopy', legacy_time), ('split_package', new_time)]:
+        print(f"{label:<24}{elapsed:>12.3f}{elapsed / len(new_packages) * 1e6:>12.2f}")
+    print(f"\nspeedup: {legacy_time / new_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+'''Benchmark parsing the text of paypal receipts, comparing the split-based parsing in
+old_versions/process_shipment_v6.py with parse_receipt from paypal_receipts.py'''
+
+import random
+import sys
+import time
+from decimal import Decimal
+from os import path
+import click
+
+sys.path.insert(0, path.dirname(path.dirname(path.realpath(__file__))))
+from paypal_receipts import parse_receipt
+from synthetic_orders import paypal_receipt_text
+
+
+ITEMS = [
+    ('American Cent Laminated Placemat', 'P1', Decimal('15.00')),
+    ('American Nickel Laminated Placemat', 'N1', Decimal('15.00')),
+    ('American Nickel Laminated Placemat', 'N12', Decimal('15.00')),
+    ('Silver Stacking Laminated Placemat', 'S1', Decimal('15.00')),
+    ('Dollar Coin Laminated Placemat', 'D1', Decimal('15.00')),
+    ("Quin's Coins Hat", 'H1', Decimal('24.99')),
+]
+STREETS = ['Main St', 'Fake Rd', 'Unreal Trail', 'Madeup rd.', 'Washtenaw Ave']
+CITIES = [
+    ('Corona, CA 92882', 'United States'),
+    ('Mount Juliet, TN 37122', 'United States'),
+    ('San Juan, PR 00901', 'Puerto Rico'),
+    ('courtenay BC V9J 1R7', 'Canada'),
+]
+
+
+def synthetic_receipt(rng, i):
+    '''Text of a receipt for a single order with a random address and line items.'''
+    city, country = rng.choice(CITIES)
+    buyer_address = [f'{rng.randint(1, 9999)} {rng.choice(STREETS)}']
+    if rng.random() < 0.3:
+        buyer_address.append(f'Spc {rng.randint(1, 300)}')
+    buyer_address += [city, country]
+    items = []
+    for description, code, price in rng.sample(ITEMS, rng.choice([1, 1, 1, 2, 3])):
+        items.append((description, code, rng.choice([1, 1, 2, 3]), price))
+    if rng.random() < 0.05:
+        items.append(('Select', 'Select', 1, Decimal('0.00')))
+    return paypal_receipt_text(i, f'CUSTOMER {i} LASTNAME', f'customer{i}@example.com', buyer_address, items)
+
+
+def legacy_parse_receipt(text):
+    '''The split-based parsing from process_shipment_v6.py, minus the product counts.'''
+    orders = []
+    orders_text = [o for o in text.split('Ship to') if o]
+    orders_text = orders_text[1:]
+    for order in orders_text:
+        items = []
+        order_items = order.split("Amount", 1)[1].split("Shipping & Handling", 1)[0].strip()
+        for item in order_items.splitlines():
+            item_details = item.strip().split()
+            items.append((item_details[-4], int(item_details[-3])))
+        customer_name = order.split("Ship from", 1)[1].split('     ')[1].title()
+        email_address = order.split("Quin's Coins")[1].split('quinscoins@gmail.com')[0].strip()
+        email_address = email_address if '@' in email_address else None
+        split_order = order.split('Address', 2)[2].split('Item Description', 1)[0].split('\n')
+        addresses = [l.lstrip() for l in split_order]
+        buyer_address = '\n'.join([l.split('     ')[0] for l in addresses][0:-1])
+        if 'United States' in buyer_address:
+            address = buyer_address.split('United States', 1)[0].strip().replace("  ", "")
+            country = 'USA'
+        elif 'Puerto Rico' in buyer_address:
+            address = buyer_address.split('Puerto Rico', 1)[0].strip().replace("  ", "")
+            country = 'USA'
+        elif 'Canada' in buyer_address:
+            address = buyer_address.split('Canada', 1)[0].strip().replace("  ", "")
+            address = address + "\nCanada"
+            country = 'Canada'
+        else:
+            raise Exception('Unknown Country in address: %s' % buyer_address)
+        mailing_address = address.replace("\n ", "\n").strip()
+        retail_price = Decimal(order.split('This is not a bill.')[0].split()[-2][1:])
+        orders.append((items, customer_name, email_address, mailing_address, country, retail_price))
+    return orders
+
+
+def time_parse(parse, receipts):
+    start = time.perf_counter()
+    orders = [order for text in receipts for order in parse(text)]
+    return time.perf_counter() - start, orders
+
+
+@click.command()
+@click.option('--receipts', '-n', default=50000, show_default=True, help="number of synthetic receipts to parse")
+def main(receipts):
+    rng = random.Random(0)
+    texts = [synthetic_receipt(rng, i) for i in range(receipts)]
+
+    legacy_time, legacy_orders = time_parse(legacy_parse_receipt, texts)
+    new_time, new_orders = time_parse(parse_receipt, texts)
+
+    summarize = lambda o: (o.items, o.customer_name, o.email_address, o.mailing_address, o.country, Decimal(o.retail_price_cents) / 100)
+    if legacy_orders != [summarize(o) for o in new_orders]:
+        raise Exception('parse_receipt produced different orders than the split-based parsing')
+
+    print(f"{receipts} receipts parsed into {len(new_orders)} orders ({sum(map(len, texts)) / 1e6:.1f} MB of text)\n")
+    print(f"{'':<24}{'time (s)':>12}{'us/receipt':>12}")
+    for label, elapsed in [('split-based', legacy_time), ('parse_receipt', new_time)]:
+        print(f"{label:<24}{elapsed:>12.3f}{elapsed / receipts * 1e6:>12.2f}")
+    print(f"\nspeedup: {legacy_time / new_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+'''Benchmark every stage of process_shipment_v7.py against synthetic corpora of several
+sizes, writing the timings to a json file so that runs can be compared with each other
+
+The script itself is run (with --profile) in a scratch copy of the project, so the timings
+cover exactly what a real run does, including the fulfilled index and the order history.
+'''
+
+import glob
+import json
+import platform
+import re
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime
+from os import makedirs, path, rename
+from tempfile import TemporaryDirectory
+import click
+
+BENCH_DIR = path.dirname(path.realpath(__file__))
+ROOT_DIR = path.dirname(BENCH_DIR)
+sys.path.insert(0, ROOT_DIR)
+from optional_numpy import load_numpy
+from synthetic_orders import write_corpus
+
+
+# files that process_shipment_v7.py needs to run from a copy of the project
+PROJECT_FILES = ['*.py', 'sku_catalog.json']
+
+
+def make_project_copy(project_dir):
+    '''Copy the scripts into project_dir, so that the state, order history and receipt cache
+    that a run writes next to process_shipment_v7.py end up there instead of in the project.'''
+    for pattern in PROJECT_FILES:
+        for f in glob.glob(path.join(ROOT_DIR, pattern)):
+            shutil.copy(f, project_dir)
+    makedirs(path.join(project_dir, 'state'), exist_ok=True)
+
+
+def stage_timings(report):
+    '''{stage: seconds} from the PROFILE table that process_shipment_v7.py --profile prints.'''
+    # the table starts after a rule and a header line, and ends with the total
+    lines = report.split('\nPROFILE\n', 1)[1].splitlines()[2:]
+    timings = {}
+    for line in lines:
+        stage, seconds = line.split()[:2]
+        if stage == 'total':
+            break
+        timings[stage] = float(seconds)
+    return timings
+
+
+def trace_counters(trace_file):
+    '''The last value of every counter recorded in a Chrome trace written by --trace.'''
+    with open(trace_file) as f:
+        events = json.load(f)['traceEvents']
+    counters = {}
+    for event in events:
+        if event['ph'] == 'C':
+            counters.update(event['args'])
+    return counters
+
+
+def time_pipeline(project_dir, workers):
+    '''Run process_shipment_v7.py (over every order, with --profile) in project_dir,
+    returning (seconds for each stage, counts).'''
+    trace_file = path.join(project_dir, 'trace.json')
+    args = [sys.executable, 'process_shipment_v7.py', '--full', '--trace', trace_file]
+    if workers is not None:
+        args += ['--workers', str(workers)]
+    report = subprocess.run(args, cwd=project_dir, capture_output=True, text=True, check=True).stdout
+    counters = trace_counters(trace_file)
+    counts = {
+        'rows': counters['rows'],
+        'orders': counters['orders'],
+        'addresses': counters['addresses'],
+        'packages': counters['packages'],
+        'address_clusters': report.count('WARNING: the following mailing addresses are very similar'),
+        'revenue': re.search(r'TOTAL REVENUE: \$([\d,.]+)', report).group(1).replace(',', ''),
+    }
+    return stage_timings(report), counts
+
+
+def load_baseline(baseline_file):
+    '''Timings from an earlier run, keyed by number of rows.'''
+    with open(baseline_file) as f:
+        return {r['rows']: r['stages'] for r in json.load(f)['results']}
+
+
+@click.command()
+@click.option('--sizes', default='1000,10000,100000,1000000', show_default=True, help="comma separated numbers of csv rows")
+@click.option('--receipts-per-1000-rows', 'receipt_rate', default=10, show_default=True, help="number of paypal receipts generated for every 1000 csv rows")
+@click.option('--files', default=4, show_default=True, help="number of .csv exports to split the rows of each corpus over")
+@click.option('--workers', '-j', type=int, default=None, help="number of processes used to parse the corpus (defaults to the number of CPUs)")
+@click.option('--output', '-o', type=click.Path(dir_okay=False), default=path.join(BENCH_DIR, 'bench_pipeline.json'), show_default=True, help="json file to write the timings to")
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False), default=None, help="json file written by an earlier run to compare the timings against")
+def main(sizes, receipt_rate, files, workers, output, baseline):
+    baseline = load_baseline(baseline) if baseline else {}
+    results = []
+    for rows in [int(s) for s in sizes.split(',')]:
+        with TemporaryDirectory() as project_dir:
+            make_project_copy(project_dir)
+            start = time.perf_counter()
+            _, receipt_files = write_corpus(project_dir, rows, rows * receipt_rate // 1000, files)
+            rename(path.join(project_dir, 'shopify_orders_csv'), path.join(project_dir, 'current_shopify_orders_csv'))
+            rename(path.join(project_dir, 'paypal_orders_txt'), path.join(project_dir, 'current_paypal_orders_pdf'))
+            generate_time = time.perf_counter() - start
+            timings, counts = time_pipeline(project_dir, workers)
+        total = sum(timings.values())
+        results.append({'rows': rows, 'receipts': len(receipt_files), 'generate': generate_time, 'total': total, 'stages': timings, 'counts': counts})
+
+        print(f"\n{rows} rows, {len(receipt_files)} receipts: {counts['orders']} orders, {counts['packages']} packages (generated in {generate_time:.1f}s)")
+        print(f"{'stage':<20}{'time (s)':>12}{'share':>8}" + (f"{'baseline (s)':>14}{'change':>9}" if rows in baseline else ''))
+        for stage in list(timings) + ['total']:
+            elapsed = total if stage == 'total' else timings[stage]
+            line = f"{stage:<20}{elapsed:>12.3f}{elapsed / total:>8.0%}"
+            if rows in baseline:
+                previous = sum(baseline[rows].values()) if stage == 'total' else baseline[rows].get(stage)
+                if previous:
+                    line += f"{previous:>14.3f}{elapsed / previous - 1:>+9.0%}"
+            print(line)
+
+    with open(output, 'w') as f:
+        json.dump({
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': load_numpy() is not None,
+            'workers': workers,
+            'files': files,
+            'results': results,
+        }, f, indent=2)
+    print(f"\ntimings written to {output}")
+
+
+if __name__ == "__main__":
+    main()
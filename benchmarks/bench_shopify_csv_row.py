@@ -0,0 +1,85 @@
+'''Benchmark building rows of a Shopify .csv export with the old setattr-per-cell class
+against the ShopifyCSVRow row factory used by process_shipment_v7.py'''
+
+import sys
+import time
+import tracemalloc
+from os import path
+import click
+
+sys.path.insert(0, path.dirname(path.dirname(path.realpath(__file__))))
+from process_shipment_v7 import shopify_csv_row_factory
+
+
+# every column of a Shopify orders export
+SHOPIFY_CSV_HEADER = [
+    'Name', 'Email', 'Financial Status', 'Paid at', 'Fulfillment Status', 'Fulfilled at',
+    'Accepts Marketing', 'Currency', 'Subtotal', 'Shipping', 'Taxes', 'Total', 'Discount Code',
+    'Discount Amount', 'Shipping Method', 'Created at', 'Lineitem quantity', 'Lineitem name',
+    'Lineitem price', 'Lineitem compare at price', 'Lineitem sku', 'Lineitem requires shipping',
+    'Lineitem taxable', 'Lineitem fulfillment status', 'Billing Name', 'Billing Street',
+    'Billing Address1', 'Billing Address2', 'Billing Company', 'Billing City', 'Billing Zip',
+    'Billing Province', 'Billing Country', 'Billing Phone', 'Shipping Name', 'Shipping Street',
+    'Shipping Address1', 'Shipping Address2', 'Shipping Company', 'Shipping City', 'Shipping Zip',
+    'Shipping Province', 'Shipping Country', 'Shipping Phone', 'Notes', 'Note Attributes',
+    'Cancelled at', 'Payment Method', 'Payment Reference', 'Refunded Amount', 'Vendor',
+    'Outstanding Balance', 'Employee', 'Location', 'Device ID', 'Id', 'Tags', 'Risk Level',
+    'Source', 'Lineitem discount', 'Tax 1 Name', 'Tax 1 Value', 'Tax 2 Name', 'Tax 2 Value',
+    'Tax 3 Name', 'Tax 3 Value', 'Tax 4 Name', 'Tax 4 Value', 'Tax 5 Name', 'Tax 5 Value',
+    'Phone', 'Receipt Number', 'Duties', 'Billing Province Name', 'Shipping Province Name',
+    'Payment ID', 'Payment Terms Name', 'Next Payment Due At', 'Payment References',
+]
+
+
+class LegacyShopifyCSVRow:
+    '''The ShopifyCSVRow class from before the row factory was introduced.'''
+    def __init__(self, attribute_list, values):
+        for attribute, value in zip(attribute_list, values):
+            attribute = attribute.replace(' ', '_')
+            setattr(self, attribute, value)
+
+
+def synthetic_rows(num_rows):
+    return [
+        [f'{column} {i}' for column in SHOPIFY_CSV_HEADER]
+        for i in range(num_rows)
+    ]
+
+
+def measure(build_rows, values):
+    start = time.perf_counter()
+    build_rows(values)
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    rows = build_rows(values)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+    return elapsed, peak
+
+
+@click.command()
+@click.option('--rows', '-n', default=100000, show_default=True, help="number of synthetic csv rows to build")
+def main(rows):
+    values = synthetic_rows(rows)
+
+    legacy_time, legacy_peak = measure(
+        lambda vs: [LegacyShopifyCSVRow(SHOPIFY_CSV_HEADER, v) for v in vs], values
+    )
+
+    def build_rows(vs):
+        make_row = shopify_csv_row_factory(SHOPIFY_CSV_HEADER)
+        return [make_row(v) for v in vs]
+    factory_time, factory_peak = measure(build_rows, values)
+
+    print(f"{'':<24}{'time (s)':>12}{'us/row':>10}{'peak memory (MB)':>20}")
+    for label, elapsed, peak in [
+        ('LegacyShopifyCSVRow', legacy_time, legacy_peak),
+        ('shopify_csv_row_factory', factory_time, factory_peak),
+    ]:
+        print(f"{label:<24}{elapsed:>12.3f}{elapsed / rows * 1e6:>10.2f}{peak / 1e6:>20.1f}")
+    print(f"\nspeedup: {legacy_time / factory_time:.1f}x, memory: {legacy_peak / factory_peak:.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+'''Benchmark how long process_shipment_v7.py takes to start, with `python -X importtime`,
+listing the modules that take longest to import'''
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from os import path
+import click
+
+
+ROOT_DIR = path.dirname(path.dirname(path.realpath(__file__)))
+
+
+def import_times(module):
+    '''{module name: (self, cumulative) import time in microseconds} for a fresh interpreter importing module.
+
+    Every module is only imported once, so each name shows up once.
+    '''
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT_DIR, env=bytecode_env(), capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_time, cumulative_time, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_time), int(cumulative_time))
+    return times
+
+
+def bytecode_env():
+    # startup is measured the way it usually runs, with the .pyc files already written
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    return env
+
+
+def time_command(args):
+    '''Wall time of running the command once.'''
+    start = time.perf_counter()
+    subprocess.run(args, cwd=ROOT_DIR, env=bytecode_env(), stdout=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - start
+
+
+@click.command()
+@click.option('--module', '-m', default='process_shipment_v7', show_default=True, help="module whose import is timed")
+@click.option('--runs', '-n', default=20, show_default=True, help="number of fresh interpreters to time")
+@click.option('--top', default=10, show_default=True, help="number of slowest imports to list")
+@click.option('--output', '-o', default=None, help="json file to write the timings to, to compare runs with")
+def main(module, runs, top, output):
+    # the first run writes any missing .pyc files, so it isn't counted
+    import_times(module)
+    time_command([sys.executable, '-c', 'pass'])
+
+    runs_times = [import_times(module) for _ in range(runs)]
+    module_times = [t[module][1] for t in runs_times]
+    interpreter_times = [time_command([sys.executable, '-c', 'pass']) for _ in range(runs)]
+    help_times = [time_command([sys.executable, module.replace('.', '/') + '.py', '--help']) for _ in range(runs)]
+
+    # the median cumulative time of every module that importing `module` pulled in
+    names = [n for n in runs_times[0] if n != module and all(n in t for t in runs_times)]
+    cumulative = {n: statistics.median(t[n][1] for t in runs_times) for n in names}
+    slowest = sorted(cumulative, key=cumulative.get, reverse=True)[:top]
+
+    print(f"import {module}: {statistics.median(module_times) / 1000:.1f} ms (median of {runs})")
+    print(f"empty interpreter: {statistics.median(interpreter_times) * 1000:.1f} ms")
+    print(f"{module}.py --help: {statistics.median(help_times) * 1000:.1f} ms")
+    print(f"\n{'slowest imports':<40}{'cumulative (ms)':>16}")
+    for name in slowest:
+        print(f"{name:<40}{cumulative[name] / 1000:>16.1f}")
+
+    if output:
+        with open(output, 'w') as f:
+            json.dump({
+                'python': sys.version.split()[0],
+                'module': module,
+                'runs': runs,
+                'import_ms': statistics.median(module_times) / 1000,
+                'interpreter_ms': statistics.median(interpreter_times) * 1000,
+                'help_ms': statistics.median(help_times) * 1000,
+                'imports_ms': {n: cumulative[n] / 1000 for n in slowest},
+            }, f, indent=2)
+        print(f"\ntimings written to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+'''Generate a synthetic corpus of Shopify .csv exports and paypal receipts to test and
+benchmark process_shipment_v7.py with, since the real exports and receipts can't be shared
+
+The corpus has orders with several line items, customers that order more than once (or
+write their address differently the second time), people ordering to near-duplicate
+addresses, hats and orders to Canada. Quantities going to each address are kept within
+what a single package can hold, so process_shipment_v7.py can process the whole corpus.
+'''
+
+import csv
+import random
+import sys
+from collections import namedtuple
+from decimal import Decimal
+from os import makedirs, path
+import click
+
+sys.path.insert(0, path.dirname(path.dirname(path.realpath(__file__))))
+from address_clusters import normalize_address
+from bench_shopify_csv_row import SHOPIFY_CSV_HEADER
+
+
+Customer = namedtuple('Customer', ['name', 'email_address', 'address1', 'address2', 'city', 'province', 'zip_code', 'country'])
+# (sku, description on receipts, price, number of placemats, weight when picking a line item)
+PRODUCTS = [
+    ('P1', 'American Cent Laminated Placemat', Decimal('15.00'), 1, 30),
+    ('N1', 'American Nickel Laminated Placemat', Decimal('15.00'), 1, 20),
+    ('S1', 'Silver Stacking Laminated Placemat', Decimal('15.00'), 1, 15),
+    ('D1', 'Dollar Coin Laminated Placemat', Decimal('15.00'), 1, 10),
+    ('M1', 'Placemat Variety Pack', Decimal('50.00'), 4, 5),
+    ('H1', "Quin's Coins Hat", Decimal('24.99'), 0, 10),
+]
+PRODUCT_WEIGHTS = [p[4] for p in PRODUCTS]
+FIRST_NAMES = [
+    'James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David', 'Elizabeth',
+    'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah', 'Charles', 'Karen',
+]
+LAST_NAMES = [
+    'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+    'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Jackson', 'Martin',
+]
+STREETS = [
+    'Main St', 'Oak Ave', 'Maple Dr', 'Washtenaw Ave', 'Cedar Ln', 'Elm St', 'Pine Rd', 'Lakeview Dr',
+    'Hillcrest Rd', 'Sunset Blvd', 'Park Pl', 'River Rd', 'Church St', 'Highland Ave', 'Mill Creek Trl',
+]
+US_CITIES = [
+    ('Ann Arbor', 'MI', '48103'), ('Corona', 'CA', '92882'), ('Mount Juliet', 'TN', '37122'),
+    ('Austin', 'TX', '78701'), ('Portland', 'OR', '97201'), ('Columbus', 'OH', '43004'),
+    ('Denver', 'CO', '80202'), ('Tampa', 'FL', '33601'), ('Albany', 'NY', '12201'), ('San Juan', 'PR', '00901'),
+]
+CA_CITIES = [
+    ('Courtenay', 'BC', 'V9J 1R7'), ('Toronto', 'ON', 'M5V 2T6'), ('Calgary', 'AB', 'T2P 1J9'), ('Halifax', 'NS', 'B3H 4R2'),
+]
+# the most placemats that fit in a single package to each country
+MAX_PLACEMATS = {'US': 9, 'CA': 5}
+
+# chance that an order comes from someone who has ordered before
+REPEAT_CUSTOMER_RATE = 0.2
+# chance that a repeat customer writes their address differently (case, punctuation)
+RESTYLED_ADDRESS_RATE = 0.3
+# chance that a new customer lives at a near-duplicate of someone else's address
+NEAR_DUPLICATE_ADDRESS_RATE = 0.02
+CANADA_RATE = 0.05
+SHOP_CASH_RATE = 0.03
+
+
+def mailing_address(customer, source='shopify'):
+    '''The mailing address that process_shipment_v7.py reads for a customer's orders.'''
+    address = '\n'.join([p for p in [customer.address1, customer.address2] if p] + [
+        f"{customer.city}, {customer.province} {customer.zip_code}"
+    ])
+    # paypal receipts keep the country at the end of addresses in Canada
+    if source == 'paypal' and customer.country == 'CA':
+        address += '\nCanada'
+    return address
+
+
+def restyled_address(rng, customer):
+    '''The same address written with different case or punctuation.'''
+    style = rng.randrange(3)
+    if style == 0:
+        return customer._replace(address1=customer.address1.upper(), city=customer.city.upper())
+    if style == 1:
+        return customer._replace(address1=customer.address1 + '.')
+    return customer._replace(address1=customer.address1.lower(), address2=customer.address2.replace('Apt', 'apt.'))
+
+
+def near_duplicate_address(rng, customer):
+    '''A different way of writing an address that no longer normalizes to the same one.'''
+    street_number, street = customer.address1.split(' ', 1)
+    variant = rng.randrange(3)
+    if variant == 0:
+        street = street.replace(' St', ' Street').replace(' Ave', ' Avenue').replace(' Dr', ' Drive').replace(' Rd', ' Road')
+    elif variant == 1 and len(street) > 6:
+        # typo
+        i = rng.randrange(1, len(street) - 1)
+        street = street[:i] + street[i + 1:]
+    else:
+        return customer._replace(address2='' if customer.address2 else f'Apt {rng.randint(1, 20)}')
+    return customer._replace(address1=f'{street_number} {street}')
+
+
+class OrderGenerator():
+    '''Generates orders from a growing pool of customers.
+
+    The number of placemats going to each (normalized) address is tracked so that no
+    address is sent more placemats than fit in one package.
+    '''
+    def __init__(self, seed=0):
+        self.rng = random.Random(seed)
+        self.customers = []
+        self.placemats_by_address = {}
+
+    def new_customer(self):
+        rng = self.rng
+        i = len(self.customers)
+        if self.customers and rng.random() < NEAR_DUPLICATE_ADDRESS_RATE:
+            # a family member, or the same person misspelling their own address
+            neighbor = rng.choice(self.customers)
+            customer = near_duplicate_address(rng, neighbor)
+            if rng.random() < 0.5:
+                customer = customer._replace(
+                    name=f'{rng.choice(FIRST_NAMES)} {neighbor.name.split()[-1]}', email_address=f'customer{i}@example.com',
+                )
+        else:
+            first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            if rng.random() < CANADA_RATE:
+                (city, province, zip_code), country = rng.choice(CA_CITIES), 'CA'
+            else:
+                (city, province, zip_code), country = rng.choice(US_CITIES), 'US'
+            customer = Customer(
+                name=f'{first_name} {last_name}',
+                email_address=f'{first_name.lower()}.{last_name.lower()}{i}@example.com',
+                # house numbers are never reused so that every new customer has their own address
+                address1=f'{i + 1} {rng.choice(STREETS)}',
+                address2=f'Apt {rng.randint(1, 40)}' if rng.random() < 0.15 else '',
+                city=city,
+                province=province,
+                zip_code=zip_code,
+                country=country,
+            )
+        self.customers.append(customer)
+        return customer
+
+    def line_items(self, max_line_items, max_placemats):
+        '''[(product, quantity)] for a single order with at most max_placemats placemats,
+        with no product listed twice.'''
+        rng = self.rng
+        num_line_items = min(max_line_items, rng.choices([1, 2, 3], weights=[70, 20, 10])[0])
+        line_items = []
+        for _ in range(10 * num_line_items):
+            if len(line_items) == num_line_items:
+                break
+            product = rng.choices(PRODUCTS, weights=PRODUCT_WEIGHTS)[0]
+            quantity = 1 if rng.random() < 0.8 else 2
+            if product[3] * quantity <= max_placemats and product not in [p for p, _ in line_items]:
+                line_items.append((product, quantity))
+                max_placemats -= product[3] * quantity
+        # an address that can't take any more placemats can still be sent a hat
+        return line_items or [(PRODUCTS[-1], 1)]
+
+    def order(self, source='shopify', max_line_items=3):
+        '''(customer, line items) of the next order.'''
+        rng = self.rng
+        customer = None
+        if self.customers and rng.random() < REPEAT_CUSTOMER_RATE:
+            customer = rng.choice(self.customers)
+            if rng.random() < RESTYLED_ADDRESS_RATE:
+                customer = restyled_address(rng, customer)
+        key = customer and normalize_address(mailing_address(customer, source))
+        if customer is None or self.placemats_by_address.get(key, 0) >= MAX_PLACEMATS[customer.country]:
+            customer = self.new_customer()
+            key = normalize_address(mailing_address(customer, source))
+        num_placemats = self.placemats_by_address.get(key, 0)
+        line_items = self.line_items(max_line_items, MAX_PLACEMATS[customer.country] - num_placemats)
+        self.placemats_by_address[key] = num_placemats + sum(product[3] * quantity for product, quantity in line_items)
+        return customer, line_items
+
+
+def shopify_csv_rows(generator, num_rows, first_order_number=1001):
+    '''Yield (order name, csv row) for num_rows rows of a Shopify orders export.
+
+    Like real exports, only the first row of an order has the order's totals, payment
+    method and shipping address filled in. The rest only list their line item.
+    '''
+    column = {c: i for i, c in enumerate(SHOPIFY_CSV_HEADER)}
+    rng = generator.rng
+    order_number = first_order_number
+    while num_rows > 0:
+        customer, line_items = generator.order(max_line_items=num_rows)
+        name = f'#{order_number}'
+        total = sum(product[2] * quantity for product, quantity in line_items)
+        for i, ((sku, description, price, _, _), quantity) in enumerate(line_items):
+            row = [''] * len(SHOPIFY_CSV_HEADER)
+            row[column['Name']] = name
+            row[column['Lineitem quantity']] = str(quantity)
+            row[column['Lineitem name']] = description
+            row[column['Lineitem price']] = str(price)
+            row[column['Lineitem sku']] = sku
+            if i == 0:
+                row[column['Email']] = customer.email_address
+                row[column['Financial Status']] = 'paid'
+                row[column['Currency']] = 'USD'
+                row[column['Subtotal']] = str(total)
+                row[column['Total']] = str(total)
+                row[column['Payment Method']] = 'Shop Cash' if rng.random() < SHOP_CASH_RATE else 'Shopify Payments'
+                row[column['Shipping Name']] = customer.name
+                row[column['Shipping Street']] = ' '.join(p for p in [customer.address1, customer.address2] if p)
+                row[column['Shipping Address1']] = customer.address1
+                row[column['Shipping Address2']] = customer.address2
+                row[column['Shipping City']] = customer.city
+                # zip codes in exports start with a single quote
+                row[column['Shipping Zip']] = "'" + customer.zip_code
+                row[column['Shipping Province']] = customer.province
+                row[column['Shipping Country']] = customer.country
+            yield name, row
+        num_rows -= len(line_items)
+        order_number += 1
+
+
+def paypal_receipt_text(invoice_number, customer_name, email_address, buyer_address, items):
+    '''Text of a paypal receipt for a single order laid out the way pdftotext extracts it.
+
+    buyer_address is the lines of the buyer's address, ending with the country, and items
+    is (description, item code, quantity, price) for each line item.
+    '''
+    seller_address = ['PO Box 131165', 'Ann Arbor, MI 48113', 'United States']
+    # the seller's address is printed in a column to the right of the buyer's
+    address_lines = [buyer_address[0]]
+    for j, line in enumerate(buyer_address[1:]):
+        seller = ('Address      ' if j == 0 else '') + (seller_address[j] if j < len(seller_address) else '')
+        address_lines.append(f'{line:<39}{seller}' if seller else line)
+    total = sum(price * quantity for _, _, quantity, price in items)
+    item_lines = [
+        f'{description:<45}{code:<15}{quantity:<14}${price:<14}${price * quantity}'
+        for description, code, quantity, price in items
+    ]
+    return '\n'.join([
+        "Quin's Coins".ljust(70) + "Invoice",
+        f"{'PO Box 131165':<70}Invoice #: {invoice_number:06d}",
+        f"{'Ann Arbor, MI 48113':<70}Invoice date: Jan 1, 2022",
+        f"{'United States':<70}Due date: Jan 1, 2022",
+        f"{'quinscoins@gmail.com':<70}Amount due: ${total} USD",
+        "Ship to",
+        f"Ship from     {customer_name}     Quin's Coins",
+        f"{email_address}     quinscoins@gmail.com",
+        "Address     Address",
+        *address_lines,
+        f"{'Item Description':<45}{'Item Code':<15}{'Quantity':<14}{'Price':<15}Amount",
+        *item_lines,
+        f"{'':<60}{'Shipping & Handling':<28}$0.00",
+        f"{'':<60}{'Subtotal':<28}${total}",
+        f"{'':<60}{'Tax':<28}$0.00",
+        f"{'':<60}{'Total':<28}${total} USD",
+        f"{'':<60}{'Amount paid':<28}${total} USD",
+        "This is not a bill.",
+        "Notes",
+        "Thank you for your order! Placemats ship within 3 business days of payment and hats",
+        "ship separately. Please contact quinscoins@gmail.com with any questions.",
+        "",
+    ])
+
+
+def paypal_receipts(generator, num_receipts):
+    '''Yield the text of num_receipts paypal receipts from the same pool of customers as the exports.'''
+    for i in range(num_receipts):
+        customer, line_items = generator.order(source='paypal')
+        buyer_address = mailing_address(customer, 'paypal').split('\n')
+        if customer.country == 'US':
+            buyer_address.append('Puerto Rico' if customer.province == 'PR' else 'United States')
+        items = [(description, sku, quantity, price) for (sku, description, price, _, _), quantity in line_items]
+        yield paypal_receipt_text(i + 1, customer.name, customer.email_address, buyer_address, items)
+
+
+def write_corpus(out_dir, num_rows, num_receipts=0, num_files=1, seed=0):
+    '''Write num_rows rows of Shopify exports (split over num_files .csv files) and
+    num_receipts receipts under out_dir. Returns (csv files, receipt files).'''
+    generator = OrderGenerator(seed)
+    csv_dir = path.join(out_dir, 'shopify_orders_csv')
+    receipt_dir = path.join(out_dir, 'paypal_orders_txt')
+    makedirs(csv_dir, exist_ok=True)
+    makedirs(receipt_dir, exist_ok=True)
+
+    csv_files = [path.join(csv_dir, f'orders_{i + 1}.csv') for i in range(num_files)]
+    rows_per_file = -(-num_rows // num_files)
+    outputs = [open(f, 'w', newline='') for f in csv_files]
+    try:
+        writers = [csv.writer(f) for f in outputs]
+        for writer in writers:
+            writer.writerow(SHOPIFY_CSV_HEADER)
+        file_index = 0
+        rows_in_file = 0
+        previous_name = None
+        for name, row in shopify_csv_rows(generator, num_rows):
+            # orders are never split across files
+            if name != previous_name and rows_in_file >= rows_per_file and file_index < num_files - 1:
+                file_index += 1
+                rows_in_file = 0
+            writers[file_index].writerow(row)
+            rows_in_file += 1
+            previous_name = name
+    finally:
+        for f in outputs:
+            f.close()
+
+    receipt_files = []
+    for i, text in enumerate(paypal_receipts(generator, num_receipts)):
+        receipt_file = path.join(receipt_dir, f'receipt_{i + 1:06d}.txt')
+        with open(receipt_file, 'w') as f:
+            f.write(text)
+        receipt_files.append(receipt_file)
+    return csv_files, receipt_files
+
+
+@click.command()
+@click.option('--out-dir', '-o', required=True, help="directory to write the exports and receipts under")
+@click.option('--rows', '-n', default=10000, show_default=True, help="number of csv rows (line items) in the exports")
+@click.option('--receipts', default=100, show_default=True, help="number of paypal receipts")
+@click.option('--files', default=1, show_default=True, help="number of .csv exports to split the rows over")
+@click.option('--seed', default=0, show_default=True, help="random seed, the same seed always gives the same corpus")
+def main(out_dir, rows, receipts, files, seed):
+    csv_files, receipt_files = write_corpus(out_dir, rows, receipts, files, seed)
+    print(f"wrote {rows} rows to {len(csv_files)} .csv files under {path.dirname(csv_files[0])}")
+    if receipt_files:
+        print(f"wrote {len(receipt_files)} receipts under {path.dirname(receipt_files[0])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+'''Script to convert the contents of paypal order files to .txt files so that they can be further operated on'''
+
+import re
+import shutil
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from os import cpu_count, listdir, path, remove
+import click
+from receipt_cache import DEFAULT_MAX_CACHE_BYTES, ReceiptTextCache
+
+
+def natural_sort_key(filename):
+    '''Sort key that orders 'order2.pdf' before 'order10.pdf', like `sort -V`.'''
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', filename)]
+
+
+def txt_filename(filename):
+    # Re-use the name of the input file, replacing .pdf with .txt
+    if filename.endswith('.pdf'):
+        filename = filename[:-len('.pdf')]
+    return filename + '.txt'
+
+
+def plan_conversions(in_dir, out_dir):
+    '''Pair every order file in in_dir with the .txt file it gets converted to.
+
+    Files are visited in natural sort order and the first file that maps to a given
+    output name wins, so the output does not depend on which conversion finishes first.
+    '''
+    conversions = {}
+    for filename in sorted([f for f in listdir(in_dir) if not f.startswith('.')], key=natural_sort_key):
+        # If the file has a .ini extension, ignore it
+        if filename.endswith('.ini'):
+            continue
+        out_file = path.join(out_dir, txt_filename(filename.replace('\r', '')))
+        conversions.setdefault(out_file, path.join(in_dir, filename))
+    return [(in_file, out_file) for out_file, in_file in conversions.items()]
+
+
+def ghostscript_txtwrite(in_file):
+    '''Text of a receipt as extracted by ghostscript's txtwrite device.'''
+    result = subprocess.run(
+        ['gs', '-q', '-sDEVICE=txtwrite', '-o', '-', in_file],
+        stdout=subprocess.PIPE, check=True,
+    )
+    return result.stdout.decode('utf-8', errors='replace')
+
+
+def convert_file(in_file, out_file, cache=None):
+    # If the file is already a txt file, just copy it over to the out directory
+    if in_file.endswith('.txt'):
+        shutil.copyfile(in_file, out_file)
+    # In all other cases, attempt to convert the file to a .txt file, unless the
+    # same receipt has already been converted by an earlier run
+    elif cache is not None:
+        text = cache.text(in_file, ghostscript_txtwrite)
+        with open(out_file, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        subprocess.run(
+            ['gs', '-sDEVICE=txtwrite', '-o', out_file, in_file],
+            stdout=subprocess.DEVNULL, check=True,
+        )
+
+
+def clear_directory(directory):
+    # hidden files such as .gitignore are left alone
+    for filename in listdir(directory):
+        if filename.startswith('.'):
+            continue
+        filename = path.join(directory, filename)
+        if path.isdir(filename):
+            shutil.rmtree(filename)
+        else:
+            remove(filename)
+
+
+def convert_orders(in_dir, out_dir, workers=None, cache=None):
+    '''Convert every order file in in_dir to a .txt file in out_dir, several at a time.
+
+    Returns the number of files that were converted.
+    '''
+    clear_directory(out_dir)
+    conversions = plan_conversions(in_dir, out_dir)
+    num_converted = 0
+    # each conversion runs in its own ghostscript process, so threads are enough to keep
+    # several of them going at once
+    with ThreadPoolExecutor(max_workers=workers or cpu_count()) as executor:
+        futures = [(in_file, executor.submit(convert_file, in_file, out_file, cache)) for in_file, out_file in conversions]
+        for in_file, future in futures:
+            try:
+                future.result()
+                num_converted += 1
+            except (OSError, subprocess.CalledProcessError) as e:
+                print("unable to convert file '%s': %s" % (in_file, e))
+    return num_converted
+
+
+@click.command()
+@click.option('--in-dir', default='current_paypal_orders_pdf', show_default=True,
+              help="directory of order files to convert. Total revenue is approximated by revenue.py "
+                   "and cut-offs for penny/nickel runs are found by run_cutoffs.py")
+@click.option('--out-dir', default='paypal_orders_txt', show_default=True, help="directory to write the .txt files to")
+@click.option('--workers', '-j', type=int, default=None, help="number of files to convert at once (defaults to the number of CPUs)")
+@click.option('--cache/--no-cache', default=True, show_default=True, help="re-use text extracted from identical receipts by earlier runs")
+@click.option('--max-cache-mb', type=int, default=DEFAULT_MAX_CACHE_BYTES // (1024 * 1024), show_default=True, help="size past which the receipt cache is trimmed")
+def main(in_dir, out_dir, workers, cache, max_cache_mb):
+    cache = ReceiptTextCache(max_bytes=max_cache_mb * 1024 * 1024) if cache else None
+    start = time.perf_counter()
+    num_converted = convert_orders(in_dir, out_dir, workers, cache)
+    elapsed = time.perf_counter() - start
+    print("Converted %d files in %.2fs (%.1f files/s)" % (num_converted, elapsed, num_converted / elapsed if elapsed else 0))
+    if cache is not None:
+        stats = cache.stats()
+        print("Receipt cache: %d hits, %d misses, %d evicted, %d entries (%.1f MB)" % (
+            stats['hits'], stats['misses'], stats['evictions'], stats['entries'], stats['bytes'] / (1024 * 1024)
+        ))
+
+
+if __name__ == "__main__":
+    main()
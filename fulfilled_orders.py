@@ -0,0 +1,108 @@
+'''Index of the orders that have already been shipped, built from the Shopify exports and paypal
+receipts moved into fulfilled/, so that they can be dropped as the current exports are read'''
+
+import json
+from os import makedirs, path, replace, stat
+from address_clusters import normalize_address
+
+
+DEFAULT_FULFILLED_DIR = path.dirname(path.realpath(__file__)) + '/fulfilled'
+DEFAULT_FULFILLED_INDEX_FILE = path.dirname(path.realpath(__file__)) + '/state/fulfilled_orders.json'
+
+# address hashes by order name of each index file that this process has loaded, keyed by
+# the index file and its modification time, so that a worker process reads an index once
+_loaded_indexes = {}
+
+
+def address_hash(mailing_address):
+    '''Short hash of a mailing address, the same however its case, spacing or punctuation was written.'''
+    # only runs with files under fulfilled/ need hashlib, so it isn't imported at start up
+    import hashlib
+    return hashlib.blake2b(normalize_address(mailing_address or '').encode('utf-8'), digest_size=8).hexdigest()
+
+
+def load_address_hashes(index_file):
+    '''Address hash of every order name in an index file, merged from each file that was indexed.'''
+    if not path.exists(index_file):
+        return {}, {}
+    with open(index_file) as f:
+        files = json.load(f)['files']
+    address_hashes = {}
+    for indexed_file in files.values():
+        address_hashes.update(indexed_file['orders'])
+    return files, address_hashes
+
+
+class FulfilledOrders():
+    '''Name and mailing address hash of every order that has already been shipped.
+
+    The index is saved as json along with the size and modification time of each file
+    it was built from, so only new or changed files under fulfilled/ are read again.
+    Looking up an order is a single dict lookup however many orders have been shipped.
+    When the index is sent to a worker process only the name of the index file is
+    pickled, and each worker reads the file itself (once), so update() must be followed
+    by save() before the index is handed to a process pool.
+    '''
+    def __init__(self, index_file=DEFAULT_FULFILLED_INDEX_FILE):
+        self.index_file = index_file
+        # {file: {'signature': [size, mtime], 'orders': {order name: address hash}}}
+        self.files, self.address_hashes = load_address_hashes(index_file)
+
+    def __len__(self):
+        return len(self.address_hashes)
+
+    def __contains__(self, order_name):
+        return order_name in self.address_hashes
+
+    def matches(self, order_name, mailing_address):
+        '''Whether order_name was shipped to mailing_address.'''
+        return self.address_hashes.get(order_name) == address_hash(mailing_address)
+
+    def update(self, signatures, read_orders):
+        '''Bring the index up to date with the files that are under fulfilled/ now.
+
+        signatures maps each file to its size and modification time. read_orders(file) is
+        only called for files that are new or have changed, and returns the (name, mailing
+        address) of each order in the file, or None if the file couldn't be read. Files that
+        couldn't be read are left out of the index (so they are read again next time), as
+        are files that are gone. Returns whether the index changed.
+        '''
+        changed_files = [f for f, signature in signatures.items() if self.files.get(f, {}).get('signature') != signature]
+        removed_files = [f for f in self.files if f not in signatures]
+        changed = bool(removed_files)
+        for fulfilled_file in removed_files:
+            del self.files[fulfilled_file]
+        for fulfilled_file in changed_files:
+            orders = read_orders(fulfilled_file)
+            if orders is None:
+                changed = self.files.pop(fulfilled_file, None) is not None or changed
+                continue
+            self.files[fulfilled_file] = {
+                'signature': signatures[fulfilled_file],
+                'orders': {name: address_hash(mailing_address) for name, mailing_address in orders},
+            }
+            changed = True
+        if changed:
+            self.address_hashes = {}
+            for indexed_file in self.files.values():
+                self.address_hashes.update(indexed_file['orders'])
+        return changed
+
+    def save(self):
+        if path.dirname(self.index_file):
+            makedirs(path.dirname(self.index_file), exist_ok=True)
+        # write to a temporary file first so that an interrupted run can't corrupt the index
+        with open(self.index_file + '.tmp', 'w') as f:
+            json.dump({'files': self.files}, f)
+        replace(self.index_file + '.tmp', self.index_file)
+
+    def __getstate__(self):
+        return self.index_file
+
+    def __setstate__(self, index_file):
+        self.index_file = index_file
+        key = (index_file, stat(index_file).st_mtime_ns if path.exists(index_file) else None)
+        if key not in _loaded_indexes:
+            _loaded_indexes.clear()
+            _loaded_indexes[key] = load_address_hashes(index_file)
+        self.files, self.address_hashes = _loaded_indexes[key]
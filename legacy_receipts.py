@@ -0,0 +1,78 @@
+'''Classifies the products on paypal receipts from before item codes were printed on them
+(the layouts handled by old_versions/process_orders.py through old_versions/process_shipment_v3.py)'''
+
+from collections import namedtuple
+from itertools import groupby
+
+
+# an order matches a rule if every phrase in all_of and at least one phrase in any_of
+# (if there are any) appear in it
+Rule = namedtuple('Rule', ['order_code', 'all_of', 'any_of'], defaults=((),))
+
+# the chain of checks in process_shipment.py through process_shipment_v3.py. The first
+# rule that matches decides the order code
+SHIPMENT_RULES = (
+    Rule('P1', ("American Cent Laminated Placemat",), ("Buy 1 Placemat", "Buy 1 Small Cent Placemat")),
+    Rule('P2', ("American Cent Laminated Placemat",), ("Buy 2 Placemats", "Buy 2 Small Cent Placemats")),
+    Rule('N1', ("American Nickel Laminated Placemat", "Buy 1 Nickel Placemat")),
+    Rule('N2', ("American Nickel Laminated Placemat", "Buy 2 Nickel Placemats")),
+    Rule('P1N1', ("1 Small Cent + 1 Nickel Placemat",)),
+    Rule('S1', ("Silver Stacking Placemat", "Buy 1 Silver Stacking Placemat")),
+    Rule('S2', ("Silver Stacking Placemat", "Buy 2 Silver Stacking Placemats")),
+    Rule('P1N1S1', ("Placemat Variety Pack",)),
+    Rule('H1', ("Quin's Coins Hat", "Buy 1 Quin's Coins Hat")),
+    Rule('H2', ("Quin's Coins Hat", "Buy 2 Quin's Coins Hats")),
+)
+# early on, payments were accepted through paypal.me, so the receipt only shows the amount
+# paid. A rule without an order code marks the order as unprocessable
+PAYPAL_ME_RULES = (
+    Rule(None, ("$15",), ("nickel", "Nickel")),
+    Rule('P1', ("$15",)),
+    Rule(None, ("$25",), ("nickel", "Nickel")),
+    Rule('P2', ("$25",)),
+    Rule('P3', ("$30", "small cent")),
+    Rule('N3', ("$30", "nickel")),
+)
+# receipts of the layout read by process_orders.py and process_shipment.py go through the
+# rules of process_shipment.py first, then through the looser checks of process_orders.py,
+# which counted any order that mentions silver stacking placemats as S1
+V1_RULES = SHIPMENT_RULES + (Rule('S1', ("Silver Stacking Placemat",)),) + PAYPAL_ME_RULES
+
+
+class ReceiptClassifier():
+    '''Works out the order code of a receipt from a table of rules.
+
+    Rules are checked in order with the same `in` checks as the chains they were taken
+    from, so a rule is dropped as soon as one of its phrases is missing and the first
+    rule that matches ends the search. Neighbouring rules that start with the same phrase
+    (such as every 'American Cent Laminated Placemat' rule) are grouped behind a single
+    check of that phrase, so it is only looked for once.
+    '''
+    def __init__(self, rules):
+        self.rules = rules
+        # [(first phrase of all_of, [(order code, rest of all_of, any_of), ...]), ...]
+        self._rule_groups = [
+            (first_phrase, [(rule.order_code, rule.all_of[1:], rule.any_of) for rule in group])
+            for first_phrase, group in groupby(rules, key=lambda rule: rule.all_of[0])
+        ]
+
+    def order_code(self, text):
+        '''Order code of the first rule that text matches.'''
+        for first_phrase, group in self._rule_groups:
+            if first_phrase not in text:
+                continue
+            for order_code, all_of, any_of in group:
+                for phrase in all_of:
+                    if phrase not in text:
+                        break
+                else:
+                    if not any_of:
+                        return order_code
+                    for phrase in any_of:
+                        if phrase in text:
+                            return order_code
+        return None
+
+
+SHIPMENT_CLASSIFIER = ReceiptClassifier(SHIPMENT_RULES)
+V1_CLASSIFIER = ReceiptClassifier(V1_RULES)
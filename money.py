@@ -0,0 +1,59 @@
+'''Amounts of money as whole numbers of cents, so that prices, fees and shipping costs add up
+exactly without building a Decimal (or rounding a float) for every order'''
+
+from decimal import Decimal
+from optional_numpy import load_numpy
+
+
+# paypal charges 3.49% of the transaction amount + $0.49, rounded half up to the nearest
+# cent. Orders to Canada are charged the same fees (see process_shipment_v6.py for details)
+PAYPAL_FEE_RATE_NUMERATOR = 349
+PAYPAL_FEE_RATE_DENOMINATOR = 10000
+PAYPAL_FIXED_FEE_CENTS = 49
+# below this many prices, plain python is faster than building a numpy array
+NUMPY_MIN_BATCH_SIZE = 256
+
+
+def parse_cents(amount):
+    '''Cents in an amount of money written out as text, such as '15.00', '$1,024.5' or '3'.
+
+    Digits past the cents are dropped, the same as int(Decimal(amount) * 100) would.
+    '''
+    text = amount.strip().lstrip('$').replace(',', '')
+    sign = 1
+    if text.startswith('-'):
+        sign = -1
+        text = text[1:]
+    whole_dollars, _, fraction = text.partition('.')
+    if not (whole_dollars or fraction) or not (whole_dollars + fraction).isdigit():
+        raise ValueError(f'not an amount of money: {amount!r}')
+    return sign * (int(whole_dollars or '0') * 100 + int((fraction + '00')[:2]))
+
+
+def dollars(cents):
+    '''The exact Decimal number of dollars in a number of cents, for printing.'''
+    return Decimal(cents) / 100
+
+
+def paypal_fee_cents(price_cents):
+    '''Paypal fees for an order of price_cents (which is never negative), in cents.'''
+    # adding half of the denominator before dividing rounds the fee half up
+    return (
+        PAYPAL_FIXED_FEE_CENTS * PAYPAL_FEE_RATE_DENOMINATOR
+        + PAYPAL_FEE_RATE_NUMERATOR * price_cents
+        + PAYPAL_FEE_RATE_DENOMINATOR // 2
+    ) // PAYPAL_FEE_RATE_DENOMINATOR
+
+
+def total_paypal_fee_cents(prices_cents):
+    '''Total paypal fees of many orders at once, each order's fee being rounded on its own.'''
+    numpy = load_numpy() if len(prices_cents) >= NUMPY_MIN_BATCH_SIZE else None
+    if numpy is not None:
+        prices = numpy.asarray(prices_cents, dtype=numpy.int64)
+        fees = (
+            PAYPAL_FIXED_FEE_CENTS * PAYPAL_FEE_RATE_DENOMINATOR
+            + PAYPAL_FEE_RATE_NUMERATOR * prices
+            + PAYPAL_FEE_RATE_DENOMINATOR // 2
+        ) // PAYPAL_FEE_RATE_DENOMINATOR
+        return int(fees.sum())
+    return sum(paypal_fee_cents(p) for p in prices_cents)
@@ -0,0 +1,18 @@
+'''numpy is only imported by the batch paths that are big enough to be sped up by it, so
+programs that never build a large batch don't spend their start-up time importing it'''
+
+
+# the numpy module once load_numpy() has tried to import it (None if it isn't installed)
+_numpy = False
+
+
+def load_numpy():
+    '''The numpy module, or None if it isn't installed. It is only imported the first time this is called.'''
+    global _numpy
+    if _numpy is False:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _numpy = numpy
+    return _numpy
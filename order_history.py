@@ -0,0 +1,236 @@
+'''SQLite store of every order and package that process_shipment_v7.py has processed, so that
+questions about earlier runs can be answered without parsing old exports and receipts again'''
+
+import sqlite3
+from datetime import datetime
+from os import makedirs, path
+from pathlib import Path
+import click
+from address_clusters import normalize_address
+from money import dollars
+from sku_catalog import PRODUCT_FIELDS
+
+
+DEFAULT_ORDER_HISTORY_FILE = path.dirname(path.realpath(__file__)) + '/state/order_history.sqlite3'
+# orders are written to the database in batches of this many rows as they are read
+BATCH_SIZE = 10000
+
+ORDER_COLUMNS = (
+    'name', 'run_id', 'source', 'order_code', 'customer_name', 'email_address', 'mailing_address',
+    'address_key', 'country', 'retail_price_cents', 'is_shop_order',
+) + PRODUCT_FIELDS
+PACKAGE_COLUMNS = (
+    'run_id', 'order_code', 'customer_name', 'email_address', 'mailing_address', 'address_key',
+    'country', 'shipping_class', 'shipping_cost_cents', 'is_shop_order', 'num_total_placemats',
+) + PRODUCT_FIELDS
+PRODUCT_COLUMN_DEFINITIONS = ''.join(f',\n    {field} INTEGER NOT NULL' for field in PRODUCT_FIELDS)
+SCHEMA = f'''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started_at TEXT NOT NULL,
+    num_orders INTEGER NOT NULL DEFAULT 0,
+    num_packages INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS orders (
+    name TEXT PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    source TEXT NOT NULL,
+    order_code TEXT,
+    customer_name TEXT,
+    email_address TEXT,
+    mailing_address TEXT,
+    address_key TEXT,
+    country TEXT,
+    retail_price_cents INTEGER NOT NULL,
+    is_shop_order INTEGER NOT NULL{PRODUCT_COLUMN_DEFINITIONS}
+);
+CREATE INDEX IF NOT EXISTS orders_by_address ON orders(address_key);
+CREATE INDEX IF NOT EXISTS orders_by_run ON orders(run_id, address_key);
+CREATE INDEX IF NOT EXISTS orders_by_customer ON orders(customer_name);
+CREATE INDEX IF NOT EXISTS orders_by_email ON orders(email_address);
+CREATE TABLE IF NOT EXISTS packages (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    order_code TEXT,
+    customer_name TEXT,
+    email_address TEXT,
+    mailing_address TEXT,
+    address_key TEXT,
+    country TEXT,
+    shipping_class TEXT,
+    shipping_cost_cents INTEGER NOT NULL,
+    is_shop_order INTEGER NOT NULL,
+    num_total_placemats INTEGER NOT NULL{PRODUCT_COLUMN_DEFINITIONS}
+);
+CREATE INDEX IF NOT EXISTS packages_by_run ON packages(run_id);
+CREATE INDEX IF NOT EXISTS packages_by_address ON packages(address_key);
+CREATE INDEX IF NOT EXISTS packages_by_customer ON packages(customer_name);
+CREATE INDEX IF NOT EXISTS packages_by_email ON packages(email_address);
+'''
+
+
+class OrderHistory():
+    '''Orders and packages from every run, in a single SQLite database.
+
+    A run is written with begin_run(), add_order() for each order, add_packages() and
+    finally commit_run(). Everything a run writes is one transaction, so a run that fails
+    part way through leaves no trace in the history (just like in the run state).
+    Processing an order again (with --full) moves it to the new run. The packages that an
+    earlier run made for an address are replaced by the new run's once none of the earlier
+    run's orders to that address are left, and the counts of every run are kept up to date.
+    With read_only set the database is only queried, so it has to exist already.
+    '''
+    def __init__(self, db_file=DEFAULT_ORDER_HISTORY_FILE, read_only=False):
+        if read_only:
+            # mode=ro never creates the file (or its schema)
+            self.connection = sqlite3.connect(Path(db_file).resolve().as_uri() + '?mode=ro', uri=True)
+        else:
+            if path.dirname(db_file):
+                makedirs(path.dirname(db_file), exist_ok=True)
+            # transactions are started explicitly so that a whole run is committed at once
+            self.connection = sqlite3.connect(db_file, isolation_level=None)
+            self.connection.executescript(SCHEMA)
+        self.run_id = None
+        self._order_rows = []
+
+    def close(self):
+        self.connection.close()
+
+    def begin_run(self):
+        self.connection.execute('BEGIN')
+        self.run_id = self.connection.execute(
+            'INSERT INTO runs (started_at) VALUES (?)', (datetime.now().isoformat(timespec='seconds'),)
+        ).lastrowid
+        return self.run_id
+
+    def add_order(self, order):
+        self._order_rows.append((
+            order.name, self.run_id, order.source, order.order_code, order.customer_name, order.email_address,
+            order.mailing_address, normalize_address(order.mailing_address), order.country,
+            order.retail_price_cents, order.is_shop_order,
+        ) + tuple(getattr(order, field) for field in PRODUCT_FIELDS))
+        if len(self._order_rows) >= BATCH_SIZE:
+            self._flush_orders()
+
+    def _flush_orders(self):
+        self.connection.executemany(
+            f"INSERT OR REPLACE INTO orders ({', '.join(ORDER_COLUMNS)}) VALUES ({', '.join('?' * len(ORDER_COLUMNS))})",
+            self._order_rows,
+        )
+        self._order_rows = []
+
+    def add_packages(self, packages):
+        rows = [
+            (
+                self.run_id, p.order_code, p.customer_name, p.email_address, p.mailing_address,
+                normalize_address(p.mailing_address), p.country, p.shipping_class, p.shipping_cost_cents,
+                p.is_shop_order, p.num_total_placemats,
+            ) + tuple(getattr(p, field) for field in PRODUCT_FIELDS)
+            for p in packages
+        ]
+        self.connection.executemany(
+            f"INSERT INTO packages ({', '.join(PACKAGE_COLUMNS)}) VALUES ({', '.join('?' * len(PACKAGE_COLUMNS))})",
+            rows,
+        )
+
+    def commit_run(self):
+        self._flush_orders()
+        # orders that were processed again have been moved to this run, so packages that
+        # earlier runs made for an address that this run ships to, and which no longer
+        # have any orders behind them, were shipped again by this run
+        self.connection.execute(
+            'DELETE FROM packages WHERE run_id != :run_id '
+            'AND address_key IN (SELECT address_key FROM packages WHERE run_id = :run_id) '
+            'AND NOT EXISTS (SELECT 1 FROM orders WHERE orders.run_id = packages.run_id AND orders.address_key = packages.address_key)',
+            {'run_id': self.run_id},
+        )
+        # which also changes the counts of the runs that the orders were moved from
+        self.connection.execute(
+            'UPDATE runs SET num_orders = (SELECT COUNT(*) FROM orders WHERE orders.run_id = runs.id), '
+            'num_packages = (SELECT COUNT(*) FROM packages WHERE packages.run_id = runs.id)'
+        )
+        self.connection.execute('COMMIT')
+
+    def total_revenue(self):
+        '''Revenue from every order ever processed.'''
+        cents = self.connection.execute('SELECT COALESCE(SUM(retail_price_cents), 0) FROM orders').fetchone()[0]
+        return dollars(cents)
+
+    def _orders_where(self, column, value):
+        cursor = self.connection.execute(
+            f'SELECT name, customer_name, email_address, mailing_address, order_code, retail_price_cents, runs.started_at '
+            f'FROM orders JOIN runs ON runs.id = orders.run_id WHERE {column} = ? ORDER BY runs.id, name',
+            (value,),
+        )
+        return cursor.fetchall()
+
+    def orders_to_address(self, mailing_address):
+        '''Every order sent to mailing_address, however its case, spacing or punctuation was written.'''
+        return self._orders_where('address_key', normalize_address(mailing_address))
+
+    def orders_by_customer(self, customer_name):
+        return self._orders_where('customer_name', customer_name)
+
+    def orders_by_email(self, email_address):
+        return self._orders_where('email_address', email_address)
+
+    def runs(self):
+        return self.connection.execute('SELECT id, started_at, num_orders, num_packages FROM runs ORDER BY id').fetchall()
+
+
+def print_orders(orders):
+    for name, customer_name, email_address, mailing_address, order_code, retail_price_cents, started_at in orders:
+        one_line_address = (mailing_address or '').replace('\n', ', ')
+        print(f"{started_at}  {name}  {order_code}  ${dollars(retail_price_cents):,.2f}  {customer_name} <{email_address}>  {one_line_address}")
+    print(f"{len(orders)} orders")
+
+
+@click.group()
+@click.option('--db', 'db_file', type=click.Path(exists=True, dir_okay=False), default=DEFAULT_ORDER_HISTORY_FILE, show_default=True, help="order history database written by process_shipment_v7.py (which creates it on its first run)")
+@click.pass_context
+def main(ctx, db_file):
+    '''Look up orders from earlier runs of process_shipment_v7.py.'''
+    ctx.obj = OrderHistory(db_file, read_only=True)
+
+
+@main.command()
+@click.pass_obj
+def revenue(history):
+    '''Total revenue across all runs.'''
+    print(f"TOTAL REVENUE: ${history.total_revenue():,.2f}")
+
+
+@main.command()
+@click.argument('mailing_address')
+@click.pass_obj
+def address(history, mailing_address):
+    '''Orders sent to an address (write new lines as commas or spaces, case doesn't matter).'''
+    print_orders(history.orders_to_address(mailing_address))
+
+
+@main.command()
+@click.argument('customer_name')
+@click.pass_obj
+def customer(history, customer_name):
+    '''Orders placed under a customer name.'''
+    print_orders(history.orders_by_customer(customer_name))
+
+
+@main.command()
+@click.argument('email_address')
+@click.pass_obj
+def email(history, email_address):
+    '''Orders placed with an email address.'''
+    print_orders(history.orders_by_email(email_address))
+
+
+@main.command()
+@click.pass_obj
+def runs(history):
+    '''Every run recorded in the history.'''
+    for run_id, started_at, num_orders, num_packages in history.runs():
+        print(f"run {run_id}  {started_at}  {num_orders} orders  {num_packages} packages")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+'''Array-backed columnar storage for the quantities on orders and packages'''
+
+from array import array
+from operator import attrgetter
+from optional_numpy import load_numpy
+
+
+# below this many records, plain python is faster than wrapping the arrays with numpy
+NUMPY_MIN_BATCH_SIZE = 256
+
+
+class ColumnarStore():
+    '''Stores selected attributes of many orders or packages as one array per column.
+
+    numeric_columns maps each attribute name to an array typecode ('q' for whole numbers,
+    'd' for floats). Attributes in coded_columns (such as source) repeat a handful of
+    strings, so each distinct string is interned once and only its code is stored.
+    '''
+    def __init__(self, numeric_columns, coded_columns=()):
+        self.numeric_columns = {name: array(typecode) for name, typecode in numeric_columns.items()}
+        self.coded_columns = {name: array('H') for name in coded_columns}
+        self.code_values = {name: [] for name in coded_columns}
+        self._code_lookup = {name: {} for name in coded_columns}
+        self._get_numeric_values = attrgetter(*self.numeric_columns)
+        self._get_coded_values = attrgetter(*self.coded_columns) if coded_columns else None
+
+    def __len__(self):
+        return len(next(iter(self.numeric_columns.values())))
+
+    def append(self, record):
+        values = self._get_numeric_values(record)
+        if len(self.numeric_columns) == 1:
+            values = (values,)
+        for column, value in zip(self.numeric_columns.values(), values):
+            column.append(value)
+        if self._get_coded_values:
+            values = self._get_coded_values(record)
+            if len(self.coded_columns) == 1:
+                values = (values,)
+            for name, value in zip(self.coded_columns, values):
+                self.coded_columns[name].append(self.intern(name, value))
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def intern(self, column, value):
+        '''The code that value is stored as in a coded column.'''
+        code = self._code_lookup[column].get(value)
+        if code is None:
+            code = self._code_lookup[column][value] = len(self.code_values[column])
+            self.code_values[column].append(value)
+        return code
+
+    def totals(self):
+        '''Sum of every numeric column, in a single pass over the arrays.'''
+        numpy = load_numpy() if len(self) >= NUMPY_MIN_BATCH_SIZE else None
+        if numpy is not None:
+            return {
+                name: numpy.frombuffer(column, dtype=column.typecode).sum().item()
+                for name, column in self.numeric_columns.items()
+            }
+        return {name: sum(column) for name, column in self.numeric_columns.items()}
+
+    def counts(self, column):
+        '''Number of records with each value of a coded column.'''
+        codes = self.coded_columns[column]
+        numpy = load_numpy() if len(codes) >= NUMPY_MIN_BATCH_SIZE else None
+        if numpy is not None:
+            counts = numpy.bincount(numpy.frombuffer(codes, dtype=codes.typecode), minlength=len(self.code_values[column])).tolist()
+        else:
+            counts = [0] * len(self.code_values[column])
+            for code in codes:
+                counts[code] += 1
+        return dict(zip(self.code_values[column], counts))
@@ -0,0 +1,166 @@
+'''Parser for the text of paypal receipts (the layout handled by old_versions/process_shipment_v6.py)'''
+
+from os import listdir, path
+from money import parse_cents
+
+
+class PaypalOrder():
+    '''A single order parsed from a paypal receipt.'''
+    __slots__ = (
+        'items',
+        'customer_name',
+        'email_address',
+        'mailing_address',
+        'country',
+        'retail_price_cents',
+    )
+
+    def __init__(self):
+        # (item code, quantity) for each line item, in receipt order
+        self.items = []
+        self.customer_name = None
+        self.email_address = None
+        self.mailing_address = None
+        self.country = None
+        self.retail_price_cents = 0
+
+    def __repr__(self):
+        return 'PaypalOrder(%s)' % ', '.join(f'{f}={getattr(self, f)!r}' for f in self.__slots__)
+
+    @property
+    def order_code(self):
+        return ''.join(code for code, _ in self.items)
+
+
+# the fields of an order always appear in this order, so each marker is searched for
+# starting where the previous one was found, with str.find bounded to the order's span
+# (finding a literal this way is faster than with a compiled regex, and no part of the
+# receipt has to be copied just to look for the next marker)
+SHIP_TO = 'Ship to'
+SHIP_FROM = 'Ship from'
+COLUMN_GAP = '     '
+SELLER_NAME = "Quin's Coins"
+SELLER_EMAIL = 'quinscoins@gmail.com'
+ADDRESS_LABEL = 'Address'
+ITEMS_HEADER = 'Item Description'
+ITEMS_HEADER_END = 'Amount'
+ITEMS_END = 'Shipping & Handling'
+RECEIPT_END = 'This is not a bill.'
+# item codes that receipts show for products that are listed under a different sku
+# FIXME: why is N12 necessary? Am I using the wrong button on the website?
+ITEM_CODE_ALIASES = {'N12': 'N1'}
+# 'Select' shows up on receipts along with N12, but isn't a product
+IGNORED_ITEM_CODES = frozenset(['Select'])
+# the buyer's country is the first of these that appears in the buyer's address
+COUNTRIES = (
+    ('United States', 'USA'),
+    ('Puerto Rico', 'USA'),
+    ('Canada', 'Canada'),
+)
+
+
+def order_spans(text, marker=SHIP_TO):
+    '''(start, end) of the text of every order in a receipt.
+
+    Orders are the text between 'Ship to' markers. Matches the old
+    `[o for o in text.split('Ship to') if o][1:]`, which skips empty pieces and
+    then always throws away the first piece.
+    '''
+    spans = []
+    start = 0
+    while True:
+        end = text.find(marker, start)
+        if end < 0:
+            end = len(text)
+        if end > start:
+            spans.append((start, end))
+        if end == len(text):
+            return spans[1:]
+        start = end + len(marker)
+
+
+def split_country(buyer_address):
+    '''(mailing address, country) of the buyer's address as printed on a receipt.'''
+    for country_name, country in COUNTRIES:
+        if country_name in buyer_address:
+            address = buyer_address.split(country_name, 1)[0].strip().replace("  ", "")
+            if country == 'Canada':
+                address = address + "\nCanada"
+            return address.replace("\n ", "\n").strip(), country
+    raise Exception('Unknown Country in address: %s' % buyer_address)
+
+
+def parse_order(text, start, end):
+    '''Parse the order that spans text[start:end], scanning it once from start to end.
+
+    Raises ValueError if one of the markers that every order has is missing.
+    '''
+    order = PaypalOrder()
+    find = text.find
+    index = text.index
+
+    # Retrieve the customer name, which is the column after 'Ship from'
+    name_start = index(COLUMN_GAP, index(SHIP_FROM, start, end) + len(SHIP_FROM), end) + len(COLUMN_GAP)
+    name_end = find(COLUMN_GAP, name_start, end)
+    if name_end < 0:
+        name_end = end
+    order.customer_name = text[name_start:name_end].title()
+
+    # the buyer's email comes right after the seller's name
+    email_start = index(SELLER_NAME, name_end, end) + len(SELLER_NAME)
+    email_end = find(SELLER_NAME, email_start, end)
+    if email_end < 0:
+        email_end = end
+    seller_email = find(SELLER_EMAIL, email_start, email_end)
+    email_address = text[email_start:email_end if seller_email < 0 else seller_email].strip()
+    order.email_address = email_address if '@' in email_address else None
+
+    # the buyer's address is the left column of the lines after the second 'Address' label
+    address_start = index(ADDRESS_LABEL, index(ADDRESS_LABEL, email_start, end) + len(ADDRESS_LABEL), end) + len(ADDRESS_LABEL)
+    address_end = find(ITEMS_HEADER, address_start, end)
+    if address_end < 0:
+        address_end = end
+    address_lines = text[address_start:address_end].split('\n')[:-1]
+    buyer_address = '\n'.join([l.lstrip().split(COLUMN_GAP, 1)[0] for l in address_lines])
+    order.mailing_address, order.country = split_country(buyer_address)
+
+    # line items sit between the 'Amount' column header and 'Shipping & Handling'.
+    # The item code and quantity are the 4th and 3rd values from the end of each line
+    items_start = index(ITEMS_HEADER_END, address_end, end) + len(ITEMS_HEADER_END)
+    items_end = find(ITEMS_END, items_start, end)
+    if items_end < 0:
+        items_end = end
+    items = order.items
+    for line in text[items_start:items_end].split('\n'):
+        item_details = line.split()
+        if item_details:
+            items.append((item_details[-4], int(item_details[-3])))
+
+    # total retail price is the 2nd value before 'This is not a bill.' minus the dollar sign
+    order.retail_price_cents = parse_cents(text[items_end:index(RECEIPT_END, items_end, end)].split()[-2])
+    return order
+
+
+def catalog_items(items):
+    '''(skus, quantities) of the products in an order's items, as listed in the sku catalog.'''
+    skus = []
+    quantities = []
+    for item_code, quantity in items:
+        if item_code not in IGNORED_ITEM_CODES:
+            skus.append(ITEM_CODE_ALIASES.get(item_code, item_code))
+            quantities.append(quantity)
+    return skus, quantities
+
+
+def receipt_files(receipt_dir):
+    # hidden files such as .gitignore and windows' desktop.ini files are not receipts
+    return sorted(
+        path.join(receipt_dir, f) for f in listdir(receipt_dir)
+        if not f.startswith('.') and not f.endswith('.ini')
+    )
+
+
+def parse_receipt(text):
+    '''Every order in the text of a paypal receipt.'''
+    return [parse_order(text, start, end) for start, end in order_spans(text)]
+
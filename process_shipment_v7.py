@@ -1,314 +1,773 @@
-'''Script to process shopify shipments'''
+'''Script to process shopify (and paypal) shipments'''
 
+# the script is run many times a day, so modules that only some runs need (the process
+# pool, receipt parsing, profiling, the order history, difflib and hashlib) are imported
+# by the code that uses them, see benchmarks/bench_startup.py
 import csv
-from os import listdir, path
+import json
+from collections import namedtuple
+from itertools import chain, repeat
+from operator import itemgetter
+from os import cpu_count, listdir, path, replace, stat
 import click
-from itertools import groupby
-from copy import deepcopy
-from difflib import SequenceMatcher
-from decimal import Decimal, ROUND_HALF_UP
-
-
-class ShopifyCSVRow:
-    '''Data contained within a row from a Shopify .csv export.'''
-    def __init__(self, attribute_list, values):
-        for attribute, value in zip(attribute_list, values):
-            attribute = attribute.replace(' ', '_')
-            setattr(self, attribute, value)
+from address_clusters import find_address_clusters, normalize_address
+from fulfilled_orders import DEFAULT_FULFILLED_DIR, FulfilledOrders
+from money import dollars, parse_cents
+from order_store import ColumnarStore
+from paypal_receipts import catalog_items, receipt_files
+from sku_catalog import DEFAULT_SKU_CATALOG_FILE, PRODUCT_FIELDS, load_sku_catalog
+from stage_timer import INGEST_THREAD, StageTimer, traced_call
+
+
+# the only columns of a Shopify .csv export that are needed to process orders
+SHOPIFY_CSV_COLUMNS = (
+    'Name',
+    'Email',
+    'Total',
+    'Lineitem quantity',
+    'Lineitem sku',
+    'Payment Method',
+    'Shipping Name',
+    'Shipping Address1',
+    'Shipping Address2',
+    'Shipping City',
+    'Shipping Zip',
+    'Shipping Province',
+    'Shipping Country',
+)
+
+# Data contained within a row from a Shopify .csv export.
+ShopifyCSVRow = namedtuple('ShopifyCSVRow', [c.replace(' ', '_') for c in SHOPIFY_CSV_COLUMNS])
+
+
+def shopify_csv_row_factory(attribute_names):
+    '''Return a function that builds a ShopifyCSVRow from the values of a single csv row.
+
+    The column positions are looked up once from the header of the file so that each
+    row only has to pick out the columns in SHOPIFY_CSV_COLUMNS.
+    '''
+    missing_columns = [c for c in SHOPIFY_CSV_COLUMNS if c not in attribute_names]
+    if missing_columns:
+        raise Exception(f"Shopify .csv export is missing columns: {', '.join(missing_columns)}")
+    get_columns = itemgetter(*[attribute_names.index(c) for c in SHOPIFY_CSV_COLUMNS])
+    make_row = ShopifyCSVRow._make
+    return lambda values: make_row(get_columns(values))
 
 
 class ShopifyOrder():
-    '''A Shopify order.'''
-    order_code = None
-    num_penny_placemats = 0
-    num_nickel_placemats = 0
-    num_silver_stacking_placemats = 0
-    num_dollar_coin_placemats = 0
-    num_hats = 0
-    customer_name = None
-    email_address = None
-    mailing_address = None
-    country = None
-    retail_price = 0
-    is_shop_order = False
+    '''A Shopify order, or an order read from a paypal receipt.'''
+    __slots__ = (
+        'name',
+        'source',
+        'order_code',
+        'num_penny_placemats',
+        'num_nickel_placemats',
+        'num_silver_stacking_placemats',
+        'num_dollar_coin_placemats',
+        'num_hats',
+        'customer_name',
+        'email_address',
+        'mailing_address',
+        'country',
+        'retail_price_cents',
+        'is_shop_order',
+        'num_line_items',
+    )
+
+    def __init__(self):
+        self.name = None
+        self.source = 'shopify'
+        self.order_code = None
+        self.num_penny_placemats = 0
+        self.num_nickel_placemats = 0
+        self.num_silver_stacking_placemats = 0
+        self.num_dollar_coin_placemats = 0
+        self.num_hats = 0
+        self.customer_name = None
+        self.email_address = None
+        self.mailing_address = None
+        self.country = None
+        self.retail_price_cents = 0
+        self.is_shop_order = False
+        # rows in the export (or items on the receipt) that the order was read from
+        self.num_line_items = 0
+
+    def __repr__(self):
+        return 'ShopifyOrder(%s)' % ', '.join(f'{f}={getattr(self, f)!r}' for f in self.__slots__)
 
 
 class Package():
     '''A single package.'''
-    order_code = None
-    num_penny_placemats = 0
-    num_nickel_placemats = 0
-    num_silver_stacking_placemats = 0
-    num_dollar_coin_placemats = 0
-    num_hats = 0
-    num_total_placemats = 0
-    customer_name = None
-    email_address = None
-    mailing_address = None
-    country = None
-    shipping_cost = 0
-    shipping_class = None
-    is_shop_order = False
-
-
-# the cost to ship a single hat varies, but is typically around $4
+    __slots__ = (
+        'order_code',
+        'num_penny_placemats',
+        'num_nickel_placemats',
+        'num_silver_stacking_placemats',
+        'num_dollar_coin_placemats',
+        'num_hats',
+        'num_total_placemats',
+        'customer_name',
+        'email_address',
+        'mailing_address',
+        'country',
+        'shipping_cost_cents',
+        'shipping_class',
+        'is_shop_order',
+    )
+
+    def __init__(self, customer_name=None, email_address=None, mailing_address=None, country=None, is_shop_order=False):
+        self.order_code = None
+        self.num_penny_placemats = 0
+        self.num_nickel_placemats = 0
+        self.num_silver_stacking_placemats = 0
+        self.num_dollar_coin_placemats = 0
+        self.num_hats = 0
+        self.num_total_placemats = 0
+        self.customer_name = customer_name
+        self.email_address = email_address
+        self.mailing_address = mailing_address
+        self.country = country
+        self.shipping_cost_cents = 0
+        self.shipping_class = None
+        self.is_shop_order = is_shop_order
+
+    def __repr__(self):
+        return 'Package(%s)' % ', '.join(f'{f}={getattr(self, f)!r}' for f in self.__slots__)
+
+    def empty_package_for_same_customer(self):
+        '''A new package with nothing in it going to the same customer and address.'''
+        return Package(self.customer_name, self.email_address, self.mailing_address, self.country, self.is_shop_order)
+
+
+# shipping costs are in cents. The cost to ship a single hat varies, but is typically around $4
 # NOTE: not accounting for Canadian shipping rates!
-SINGLE_HAT_SHIPPING_COST_USA = 4.00
+SINGLE_HAT_SHIPPING_COST_USA_CENTS = 400
 # NOTE: I do not know if the below price is actually accurate. I will need to ship one of these
 # from the post office before I know for sure. This is pretty pricey!
-SINGLE_HAT_SHIPPING_COST_CANADA = 14.85
-NUM_PLACEMATS_TO_SHIPPING_COST = {
+SINGLE_HAT_SHIPPING_COST_CANADA_CENTS = 1485
+NUM_PLACEMATS_TO_SHIPPING_COST_CENTS = {
     'US': {
-        '1': 2.44,
-        '2': 3.28,
-        '3': 3.84,
-        '4': 4.74,
+        '1': 244,
+        '2': 328,
+        '3': 384,
+        '4': 474,
         # packages of 5 or 6 placemats must be sent via priority which doesn't
         # have a set price, but can cost up to $10
-        '5': 10.00,
-        '6': 10.00,
-        '7': 10.00,
-        '8': 10.00,
-        '9': 10.00,
+        '5': 1000,
+        '6': 1000,
+        '7': 1000,
+        '8': 1000,
+        '9': 1000,
     },
     # FIXME: not sure if it shows up as "Canada" in csv, or something else. Will need
     # to fill this in once someone from Canada places an order
     'CA': {
-        '1': 4.12,
-        '2': 5.02,
-        '3': 6.79,
-        '4': 6.79,
-        '5': 8.27,
+        '1': 412,
+        '2': 502,
+        '3': 679,
+        '4': 679,
+        '5': 827,
         # 6 or more placemats to Canada cannot be done
     }
 }
+# paypal receipts spell out the countries that Shopify exports abbreviate
+PAYPAL_COUNTRY_CODES = {
+    'USA': 'US',
+    'Canada': 'CA',
+}
+# paypal receipts are handed to the process pool in about this many chunks per worker
+RECEIPT_CHUNKS_PER_WORKER = 4
 
 
-def get_address_similarity_ratio(a1, a2):
-    return SequenceMatcher(None, a1, a2).ratio()
-
-
-def update_order_product_quantities(order, sku, item_quantity):
-    if sku == 'P1':
-        order.num_penny_placemats += item_quantity
-    elif sku == 'N1':
-        order.num_nickel_placemats += item_quantity
-    elif sku == 'S1':
-        order.num_silver_stacking_placemats += item_quantity
-    elif sku == 'D1':
-        order.num_dollar_coin_placemats += item_quantity
-    elif sku == 'M1':
-        order.num_penny_placemats += item_quantity
-        order.num_nickel_placemats += item_quantity
-        order.num_silver_stacking_placemats += item_quantity
-        order.num_dollar_coin_placemats += item_quantity
-    elif sku == 'H1':
-        order.num_hats += item_quantity
-    else:
-        raise Exception(f'Unknown sku: {sku}')
-
+def order_store():
+    '''Columnar store for the totals needed from every ShopifyOrder.'''
+    return ColumnarStore(
+        dict.fromkeys(PRODUCT_FIELDS + ('retail_price_cents', 'num_line_items'), 'q'),
+        coded_columns=('source',),
+    )
 
-@click.command()
-def main():
 
-    shopify_orders = []
-    packages = []
-    total_revenue = 0
+def package_store():
+    '''Columnar store for the totals needed from every Package.'''
+    return ColumnarStore(
+        dict.fromkeys(PRODUCT_FIELDS + ('num_total_placemats', 'shipping_cost_cents'), 'q'),
+    )
 
-    SHOPIFY_ORDERS_CSV_DIR = "current_shopify_orders_csv"
-    current_shopify_orders_files = listdir("./" + SHOPIFY_ORDERS_CSV_DIR)
-    csv_files = [f for f in current_shopify_orders_files if f.endswith('.csv')]
-    if len(csv_files) != 1:
-        raise Exception(f"Only one .csv file should exist under '{SHOPIFY_ORDERS_CSV_DIR}'")
-    csv_file = path.dirname(path.realpath(__file__)) + '/' + SHOPIFY_ORDERS_CSV_DIR + '/' + csv_files[0]
 
+def set_product_quantities(record, product_quantities):
+    '''Set the num_* product fields of an order or package from a catalog vector.'''
+    for field, quantity in zip(PRODUCT_FIELDS, product_quantities):
+        setattr(record, field, quantity)
+
+
+def shopify_mailing_address(row):
+    '''The mailing address of the order in a row of a Shopify .csv export.'''
+    # shipping zip codes begin with single quotes for some unknown reason, so they
+    # have to be removed
+    shipping_zip = row.Shipping_Zip.replace("'", "")
+    address_parts = [
+        row.Shipping_Address1,
+        row.Shipping_Address2,
+        f"{row.Shipping_City}, {row.Shipping_Province} {shipping_zip}"
+    ]
+    return '\n'.join([p for p in address_parts if p])
+
+
+def paypal_order_names(receipt_text, num_orders):
+    '''Names of the orders on a paypal receipt, from its text and each order's position on it.
+
+    Receipt file names (such as order1.pdf) are reused between batches of receipts, so
+    orders are named after a hash of what the receipt says instead of the file it is in.
+    '''
+    import hashlib
+    receipt_hash = hashlib.sha256(receipt_text.encode('utf-8')).hexdigest()[:16]
+    return [f'paypal-{receipt_hash}#{position}' for position in range(1, num_orders + 1)]
+
+
+def already_fulfilled(fulfilled_orders, order_name, mailing_address):
+    '''Whether an order is in the fulfilled index (see fulfilled_orders.py) with the same mailing address.
+
+    An order whose name is in the index but that is going to a different address (a
+    Shopify export that reuses order names, or an address that was corrected after the
+    order was shipped) is warned about and kept.
+    '''
+    if fulfilled_orders.matches(order_name, mailing_address):
+        return True
+    print(f"WARNING: order '{order_name}' is under fulfilled/ but was shipped to a different address. It will be processed again")
+    return False
+
+
+def read_shopify_orders(csv_file, skip_order_names=frozenset(), sku_catalog=None, fulfilled_orders=None):
+    '''Yield each ShopifyOrder in a Shopify .csv export as soon as all of its rows have been read.
+
+    Orders span one row per line item, so an order is only finished once the 'Name'
+    column changes (or the end of the file is reached). Rows of orders in skip_order_names
+    are dropped before any row or order object is created for them. Rows of orders in
+    fulfilled_orders are dropped too, once the first row shows that the order is going to
+    the address it was shipped to. The line items of each order are expanded into
+    product quantities through sku_catalog in one batch.
+    '''
+    sku_catalog = sku_catalog or load_sku_catalog()
+    fulfilled_orders = fulfilled_orders or frozenset()
     with open(csv_file, newline='') as f:
         reader = csv.reader(f, delimiter=',')
         attribute_names = next(reader)
-        csv_rows = [ShopifyCSVRow(attribute_names, r) for r in reader]
-    
-    previous_order_name = None
-    for row in csv_rows:
-        current_order_name = row.Name
-        if current_order_name == previous_order_name:
-            # update the previous order
-            previous_order = shopify_orders[-1]
+        make_row = shopify_csv_row_factory(attribute_names)
+        name_column = attribute_names.index('Name')
+        order = None
+        skus = []
+        item_quantities = []
+        previous_order_name = None
+        fulfilled_order_name = None
+        for values in reader:
+            order_name = values[name_column]
+            if order_name in skip_order_names or order_name == fulfilled_order_name:
+                continue
+            row = make_row(values)
+            if order_name in fulfilled_orders and order_name != previous_order_name \
+               and already_fulfilled(fulfilled_orders, order_name, shopify_mailing_address(row)):
+                # the rest of the order's rows are dropped without being looked up again
+                fulfilled_order_name = order_name
+                continue
+            current_order_name = row.Name
             sku = row.Lineitem_sku
             item_quantity = int(row.Lineitem_quantity)
-            previous_order.order_code = previous_order.order_code + sku
-            update_order_product_quantities(previous_order, sku, item_quantity)
-            shopify_orders[-1] = previous_order
+            if current_order_name == previous_order_name:
+                # update the previous order
+                order.order_code = order.order_code + sku
+            else:
+                # the previous order is complete
+                if order is not None:
+                    set_product_quantities(order, sku_catalog.expand_many(skus, item_quantities))
+                    order.num_line_items = len(skus)
+                    yield order
+                skus = []
+                item_quantities = []
+                # create a new order
+                order = ShopifyOrder()
+                order.name = current_order_name
+                order.is_shop_order = 'Shop Cash' in row.Payment_Method
+
+                order.order_code = sku
+                order.customer_name = row.Shipping_Name
+                order.email_address = row.Email
+                order.mailing_address = shopify_mailing_address(row)
+                order.country = row.Shipping_Country
+                order.retail_price_cents = parse_cents(row.Total)
+            skus.append(sku)
+            item_quantities.append(item_quantity)
+            previous_order_name = current_order_name
+        if order is not None:
+            set_product_quantities(order, sku_catalog.expand_many(skus, item_quantities))
+            order.num_line_items = len(skus)
+            yield order
+
+
+def parse_shopify_orders_csv(csv_file, skip_order_names=frozenset(), sku_catalog=None, fulfilled_orders=None):
+    '''Parse every order in a single Shopify .csv export (run inside a worker process).'''
+    return list(read_shopify_orders(csv_file, skip_order_names, sku_catalog, fulfilled_orders))
+
+
+def read_paypal_orders(receipt_file, skip_order_names=frozenset(), sku_catalog=None, fulfilled_orders=None):
+    '''Yield a ShopifyOrder for each order on a paypal receipt of any layout.
+
+    Orders are named after the receipt's text and their position on it (see
+    paypal_order_names) so that, like Shopify orders, they can be skipped by later runs.
+    '''
+    from receipt_cache import ReceiptTextCache, read_receipt_text
+    from receipt_formats import parse_any_receipt
+
+    sku_catalog = sku_catalog or load_sku_catalog()
+    fulfilled_orders = fulfilled_orders or frozenset()
+    receipt_text = read_receipt_text(receipt_file, ReceiptTextCache())
+    _, paypal_orders = parse_any_receipt(receipt_text)
+    for order_name, paypal_order in zip(paypal_order_names(receipt_text, len(paypal_orders)), paypal_orders):
+        if order_name in skip_order_names:
+            continue
+        if order_name in fulfilled_orders and already_fulfilled(fulfilled_orders, order_name, paypal_order.mailing_address):
+            continue
+        order = ShopifyOrder()
+        order.name = order_name
+        order.source = 'paypal'
+        order.order_code = paypal_order.order_code
+        order.customer_name = paypal_order.customer_name
+        order.email_address = paypal_order.email_address
+        order.mailing_address = paypal_order.mailing_address
+        order.country = PAYPAL_COUNTRY_CODES[paypal_order.country]
+        order.retail_price_cents = paypal_order.retail_price_cents
+        set_product_quantities(order, sku_catalog.expand_many(*catalog_items(paypal_order.items)))
+        order.num_line_items = len(paypal_order.items)
+        yield order
+
+
+def parse_paypal_receipt(receipt_file, skip_order_names=frozenset(), sku_catalog=None, fulfilled_orders=None):
+    '''Parse every order on a single paypal receipt (run inside a worker process).
+
+    A receipt that can't be read or parsed is reported and None is returned instead.
+    '''
+    try:
+        return list(read_paypal_orders(receipt_file, skip_order_names, sku_catalog, fulfilled_orders))
+    except Exception as e:
+        print("unable to process file '%s': %s" % (receipt_file, e))
+        return None
+
+
+def drop_duplicate_orders(orders_by_file):
+    '''Yield orders from each file in turn, skipping any order whose name has already been seen.'''
+    seen_order_names = set()
+    for orders in orders_by_file:
+        for order in orders:
+            if order.name not in seen_order_names:
+                seen_order_names.add(order.name)
+                yield order
+
+
+def read_all_orders(csv_files, receipt_files=(), workers=None, skip_order_names=frozenset(), sku_catalog=None, failed_receipt_files=None, timer=None, fulfilled_orders=None):
+    '''Yield the orders from several Shopify .csv exports and paypal receipts, dropping orders that show up in more than one.
+
+    Exports and receipts are parsed in parallel in the same pool of processes, but their
+    orders are merged in the order that the files are given in (exports first), so the
+    first file that contains an order always wins. Orders in skip_order_names, and orders
+    that have already been shipped according to fulfilled_orders, are dropped while the
+    files are parsed. Receipts that couldn't be parsed are added to failed_receipt_files.
+    If timer is tracing, a span is recorded for parsing each file, in whichever process
+    parsed it.
+    '''
+    timer = timer or StageTimer()
+
+    def traced_files(files, traced_orders_by_file):
+        for f, (orders, (pid, start, duration)) in zip(files, traced_orders_by_file):
+            timer.span('parse ' + path.basename(f), start, duration, pid=pid, tid=INGEST_THREAD, orders=len(orders or ()))
+            yield orders
+
+    def parsed_receipts(orders_by_receipt):
+        for receipt_file, orders in zip(receipt_files, orders_by_receipt):
+            if orders is None:
+                if failed_receipt_files is not None:
+                    failed_receipt_files.append(receipt_file)
+                continue
+            yield orders
+
+    num_files = len(csv_files) + len(receipt_files)
+    workers = min(workers or cpu_count(), num_files)
+    if workers <= 1:
+        # no need to start a process pool, just stream each file
+        shopify_orders = (
+            timer.traced_items('parse ' + path.basename(f), read_shopify_orders(f, skip_order_names, sku_catalog, fulfilled_orders))
+            for f in csv_files
+        )
+        if timer.tracing:
+            paypal_orders = traced_files(receipt_files, (traced_call(parse_paypal_receipt, f, skip_order_names, sku_catalog, fulfilled_orders) for f in receipt_files))
         else:
-            # create a new order
-            order = ShopifyOrder()
-            sku = row.Lineitem_sku
-            item_quantity = int(row.Lineitem_quantity)
-            order.is_shop_order = 'Shop Cash' in row.Payment_Method
-
-            order.order_code = sku
-            order.customer_name = row.Shipping_Name
-            order.email_address = row.Email
-            # shipping zip codes begin with single quotes for some unknown reason, so they
-            # have to be removed
-            shipping_zip = row.Shipping_Zip.replace("'", "")
-            address_parts = [
-                row.Shipping_Address1,
-                row.Shipping_Address2,
-                f"{row.Shipping_City}, {row.Shipping_Province} {shipping_zip}"
-            ]
-            order.mailing_address = '\n'.join([p for p in address_parts if p])
-            order.country = row.Shipping_Country
-            order.retail_price = Decimal(row.Total)
-
-            total_revenue += order.retail_price
-
-            update_order_product_quantities(order, sku, item_quantity)
-            shopify_orders.append(order)
-        previous_order_name = current_order_name
-
-     # DEBUG
-    #for shopify_order in shopify_orders:
-    #    print(shopify_order.__dict__)
-    
-
-    # NOTE: consider grouping by name instead because grouping by address is 
-    # looking like it will be too complicated
-    # group shopify orders by address
-    grouped_shopify_orders = groupby(
-        sorted(shopify_orders, key = lambda p: p.mailing_address),
-        key = lambda p: p.mailing_address,
-    )
-
-    for mailing_address, orders in grouped_shopify_orders:
-        orders = list(orders)
-        
-        # DEBUG
-        #print(mailing_address)
-        #for order in orders:
-        #    print(order.__dict__)
-
-        package = Package()
-        package.mailing_address = mailing_address
-        for o in orders:
-            package.country = o.country
-            package.customer_name = o.customer_name
-            package.email_address = o.email_address
-            package.is_shop_order = o.is_shop_order
-            package.num_penny_placemats += o.num_penny_placemats
-            package.num_nickel_placemats += o.num_nickel_placemats
-            package.num_silver_stacking_placemats += o.num_silver_stacking_placemats
-            package.num_dollar_coin_placemats += o.num_dollar_coin_placemats
-            package.num_hats += o.num_hats
-        num_total_placemats = package.num_penny_placemats + package.num_nickel_placemats + package.num_silver_stacking_placemats + package.num_dollar_coin_placemats
-        package.num_total_placemats = num_total_placemats
-        # hats get shipped in packages that are separate from placemats
-        if package.num_hats > 0:
-            # each hat needs its own package because the boxes are too small
-            # to fit more than one in a box
-            hat_package = deepcopy(package)
-            hat_package.num_penny_placemats = 0
-            hat_package.num_nickel_placemats = 0
-            hat_package.num_silver_stacking_placemats = 0
-            hat_package.num_dollar_coin_placemats = 0
-            hat_package.num_total_placemats = 0
+            paypal_orders = (parse_paypal_receipt(f, skip_order_names, sku_catalog, fulfilled_orders) for f in receipt_files)
+        yield from drop_duplicate_orders(chain(shopify_orders, parsed_receipts(paypal_orders)))
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    # receipts are small, so they are handed to the workers a few at a time rather than
+    # pickling the arguments again for every receipt
+    receipt_chunksize = max(1, len(receipt_files) // (workers * RECEIPT_CHUNKS_PER_WORKER))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # both sources are submitted before either is consumed so that they are parsed concurrently
+        if timer.tracing:
+            # workers also send back when they parsed each file
+            shopify_orders = traced_files(csv_files, executor.map(
+                traced_call, repeat(parse_shopify_orders_csv), csv_files, repeat(skip_order_names), repeat(sku_catalog), repeat(fulfilled_orders),
+            ))
+            paypal_orders = traced_files(receipt_files, executor.map(
+                traced_call, repeat(parse_paypal_receipt), receipt_files, repeat(skip_order_names), repeat(sku_catalog), repeat(fulfilled_orders),
+                chunksize=receipt_chunksize,
+            ))
+        else:
+            shopify_orders = executor.map(parse_shopify_orders_csv, csv_files, repeat(skip_order_names), repeat(sku_catalog), repeat(fulfilled_orders))
+            paypal_orders = executor.map(
+                parse_paypal_receipt, receipt_files, repeat(skip_order_names), repeat(sku_catalog), repeat(fulfilled_orders),
+                chunksize=receipt_chunksize,
+            )
+        yield from drop_duplicate_orders(chain(shopify_orders, parsed_receipts(paypal_orders)))
+
+
+def add_order_to_package(packages_by_address, order):
+    '''Add the products in an order to the package going to its mailing address.
+
+    Packages are keyed by the normalized mailing address so that addresses which only
+    differ in case, whitespace or punctuation end up in the same package.
+    '''
+    address_key = normalize_address(order.mailing_address)
+    package = packages_by_address.get(address_key)
+    if package is None:
+        package = packages_by_address[address_key] = Package()
+        package.mailing_address = order.mailing_address
+    package.country = order.country
+    package.customer_name = order.customer_name
+    package.email_address = order.email_address
+    package.is_shop_order = order.is_shop_order
+    package.num_penny_placemats += order.num_penny_placemats
+    package.num_nickel_placemats += order.num_nickel_placemats
+    package.num_silver_stacking_placemats += order.num_silver_stacking_placemats
+    package.num_dollar_coin_placemats += order.num_dollar_coin_placemats
+    package.num_hats += order.num_hats
+
+
+def split_package(package):
+    '''Split everything going to a single address into the packages that actually get shipped.'''
+    split_packages = []
+    num_total_placemats = package.num_penny_placemats + package.num_nickel_placemats + package.num_silver_stacking_placemats + package.num_dollar_coin_placemats
+    package.num_total_placemats = num_total_placemats
+    # hats get shipped in packages that are separate from placemats
+    if package.num_hats > 0:
+        # each hat needs its own package because the boxes are too small
+        # to fit more than one in a box
+        if package.country == 'USA' or package.country == 'US':
+            hat_shipping_cost_cents = SINGLE_HAT_SHIPPING_COST_USA_CENTS
+        elif package.country == 'Canada' or package.country == 'CA':
+            hat_shipping_cost_cents = SINGLE_HAT_SHIPPING_COST_CANADA_CENTS
+        else:
+            raise Exception('Unknown Country: %s' % package.country)
+        # NOTE: untested so far since no one has bought two hats at once
+        for i in range(package.num_hats):
+            hat_package = package.empty_package_for_same_customer()
             hat_package.order_code = 'H1'
-            if hat_package.country == 'USA' or hat_package.country == 'US':
-                hat_package.shipping_cost = SINGLE_HAT_SHIPPING_COST_USA
-            elif hat_package.country == 'Canada':
-                hat_package.shipping_cost = SINGLE_HAT_SHIPPING_COST_CANADA
-            else:
-                raise Exception('Unknown Country: %s' % hat_package.country)
-            num_hats = hat_package.num_hats
             hat_package.num_hats = 1
-            # NOTE: untested so far since no one has bought two hats at once
-            for i in range(num_hats):
-                packages.append(hat_package)
-        if package.num_total_placemats > 0:
-            placemat_package = deepcopy(package)
-            placemat_package.num_hats = 0
-            if placemat_package.country == 'USA' and placemat_package.num_total_placemats > 9:
-                # NOTE: what to do in this scenario? Should probably divide placemats
-                # into separate packages in this case
-                raise Exception('unable to ship more than 9 placemats in a single package within USA')
-            if placemat_package.country == 'Canada' and placemat_package.num_total_placemats > 5:
-                # NOTE: should handle this situation better by splitting the shipment up
-                raise Exception('unable to ship more than 5 placemats in a single package to Canada')
-            placemat_package.shipping_cost = NUM_PLACEMATS_TO_SHIPPING_COST.get(placemat_package.country, {}).get(str(placemat_package.num_total_placemats))
-            if placemat_package.shipping_cost is None:
-                raise Exception('Unable to retrieve shipping cost for %s placemats to %s' % (
-                    placemat_package.num_total_placemats, placemat_package.country
-                ))
-            placemat_package.order_code = '%s%s%s%s' % (
-                ('P' + str(placemat_package.num_penny_placemats)) if placemat_package.num_penny_placemats else '',
-                ('N' + str(placemat_package.num_nickel_placemats)) if placemat_package.num_nickel_placemats else '',
-                ('S' + str(placemat_package.num_silver_stacking_placemats)) if placemat_package.num_silver_stacking_placemats else '',
-                ('D' + str(placemat_package.num_dollar_coin_placemats)) if placemat_package.num_dollar_coin_placemats else '',
-            )
+            hat_package.shipping_cost_cents = hat_shipping_cost_cents
+            split_packages.append(hat_package)
+    if package.num_total_placemats > 0:
+        placemat_package = package.empty_package_for_same_customer()
+        placemat_package.num_penny_placemats = package.num_penny_placemats
+        placemat_package.num_nickel_placemats = package.num_nickel_placemats
+        placemat_package.num_silver_stacking_placemats = package.num_silver_stacking_placemats
+        placemat_package.num_dollar_coin_placemats = package.num_dollar_coin_placemats
+        placemat_package.num_total_placemats = package.num_total_placemats
+        if placemat_package.country == 'USA' and placemat_package.num_total_placemats > 9:
+            # NOTE: what to do in this scenario? Should probably divide placemats
+            # into separate packages in this case
+            raise Exception('unable to ship more than 9 placemats in a single package within USA')
+        if placemat_package.country == 'Canada' and placemat_package.num_total_placemats > 5:
+            # NOTE: should handle this situation better by splitting the shipment up
+            raise Exception('unable to ship more than 5 placemats in a single package to Canada')
+        placemat_package.shipping_cost_cents = NUM_PLACEMATS_TO_SHIPPING_COST_CENTS.get(placemat_package.country, {}).get(str(placemat_package.num_total_placemats))
+        if placemat_package.shipping_cost_cents is None:
+            raise Exception('Unable to retrieve shipping cost for %s placemats to %s' % (
+                placemat_package.num_total_placemats, placemat_package.country
+            ))
+        placemat_package.order_code = '%s%s%s%s' % (
+            ('P' + str(placemat_package.num_penny_placemats)) if placemat_package.num_penny_placemats else '',
+            ('N' + str(placemat_package.num_nickel_placemats)) if placemat_package.num_nickel_placemats else '',
+            ('S' + str(placemat_package.num_silver_stacking_placemats)) if placemat_package.num_silver_stacking_placemats else '',
+            ('D' + str(placemat_package.num_dollar_coin_placemats)) if placemat_package.num_dollar_coin_placemats else '',
+        )
+
+        if (not placemat_package.is_shop_order) and \
+           placemat_package.num_total_placemats < 5 or \
+           (placemat_package.num_total_placemats == 5 and placemat_package.country == 'CA'):
+            # first class mail
+            placemat_package.shipping_class = 'first_class'
+        else:
+            # priority mail
+            placemat_package.shipping_class = 'priority'
+            placemat_package.shipping_cost_cents = 1000
+        split_packages.append(placemat_package)
+    return split_packages
+
+
+def get_address_similarity_ratio(a1, a2):
+    from difflib import SequenceMatcher
+    return SequenceMatcher(None, a1, a2).ratio()
+
+
+def find_duplicate_name_packages(packages):
+    '''Map each customer name whose packages go to more than one mailing address to those addresses.'''
+    # index every customer name to the set of addresses it ships to in a single pass
+    mailing_addresses_by_name = {}
+    for p in packages:
+        mailing_addresses_by_name.setdefault(p.customer_name, set()).add(p.mailing_address)
+    return {
+        name: list(mailing_addresses)
+        for name, mailing_addresses in mailing_addresses_by_name.items()
+        if len(mailing_addresses) > 1
+    }
+
+
+def csv_file_signature(csv_file):
+    '''Size and modification time of a file, used to tell if an export changed since the last run.'''
+    file_stat = stat(csv_file)
+    return [file_stat.st_size, file_stat.st_mtime_ns]
+
+
+def load_run_state(state_file):
+    '''Load the names of orders (and the .csv exports) that previous runs have already processed.'''
+    if not path.exists(state_file):
+        return {'files': {}, 'orders': set()}
+    with open(state_file) as f:
+        state = json.load(f)
+    return {'files': state['files'], 'orders': set(state['orders'])}
+
+
+def save_run_state(state_file, state):
+    # write to a temporary file first so that an interrupted run can't corrupt the state
+    with open(state_file + '.tmp', 'w') as f:
+        json.dump({'files': state['files'], 'orders': sorted(state['orders'])}, f)
+    replace(state_file + '.tmp', state_file)
+
+
+def read_fulfilled_orders(fulfilled_file):
+    '''(name, mailing address) of each order in a Shopify .csv export or paypal receipt that has been shipped.'''
+    if fulfilled_file.endswith('.csv'):
+        orders = []
+        with open(fulfilled_file, newline='') as f:
+            reader = csv.reader(f, delimiter=',')
+            attribute_names = next(reader)
+            make_row = shopify_csv_row_factory(attribute_names)
+            name_column = attribute_names.index('Name')
+            previous_order_name = None
+            for values in reader:
+                # only the first row of an order is needed
+                if values[name_column] != previous_order_name:
+                    row = make_row(values)
+                    orders.append((row.Name, shopify_mailing_address(row)))
+                    previous_order_name = row.Name
+        return orders
+    from receipt_cache import ReceiptTextCache, read_receipt_text
+    from receipt_formats import parse_any_receipt
+    receipt_text = read_receipt_text(fulfilled_file, ReceiptTextCache())
+    _, paypal_orders = parse_any_receipt(receipt_text)
+    return [(name, o.mailing_address) for name, o in zip(paypal_order_names(receipt_text, len(paypal_orders)), paypal_orders)]
+
+
+def parse_fulfilled_file(fulfilled_file):
+    '''read_fulfilled_orders, except that a file that can't be read or parsed is reported and None is returned instead.'''
+    try:
+        return read_fulfilled_orders(fulfilled_file)
+    except Exception as e:
+        print("unable to process file '%s': %s" % (fulfilled_file, e))
+        return None
+
+
+def load_fulfilled_orders(fulfilled_dir=DEFAULT_FULFILLED_DIR):
+    '''Index of every order in the exports and receipts under fulfilled_dir.
+
+    Only files that are new or changed since the saved index was built are read, after
+    which the index is saved again. Files that can't be parsed are reported and left out.
+    '''
+    fulfilled_orders = FulfilledOrders()
+    fulfilled_files = receipt_files(fulfilled_dir) if path.isdir(fulfilled_dir) else []
+    if fulfilled_orders.update({f: csv_file_signature(f) for f in fulfilled_files}, parse_fulfilled_file):
+        fulfilled_orders.save()
+    return fulfilled_orders
+
+
+@click.command()
+@click.option('--workers', '-j', type=int, default=None, help="number of processes used to parse .csv exports and paypal receipts (defaults to the number of CPUs)")
+@click.option('--full', is_flag=True, help="process every order in the exports and receipts, including orders processed by previous runs")
+@click.option('--include-fulfilled', is_flag=True, help="also process orders that are in the exports and receipts under fulfilled/ (which have already been shipped)")
+@click.option('--sku-catalog', 'sku_catalog_file', type=click.Path(exists=True, dir_okay=False), default=DEFAULT_SKU_CATALOG_FILE, help="json file describing the products that make up each sku")
+@click.option('--profile', is_flag=True, help="print how long each stage of the run took")
+@click.option('--profile-stats', 'profile_dir', type=click.Path(file_okay=False), default=None, help="also write cProfile stats for each stage to <dir>/<stage>.prof (implies --profile)")
+@click.option('--profile-memory', is_flag=True, help="also record the peak memory allocated during each stage with tracemalloc (implies --profile, slows the run down)")
+@click.option('--trace', 'trace_file', type=click.Path(dir_okay=False), default=None, help="write a Chrome trace of the run (stages, the parsing of each file and counts of rows, orders and packages) to this json file (implies --profile)")
+@click.option('--history/--no-history', 'keep_history', default=True, show_default=True, help="record the orders and packages of this run in the order history database")
+@click.option('--history-db', 'history_file', type=click.Path(dir_okay=False), default=None, help="order history database (defaults to state/order_history.sqlite3, see `python order_history.py --help`)")
+def main(workers, full, include_fulfilled, sku_catalog_file, profile, profile_dir, profile_memory, trace_file, keep_history, history_file):
+    timer = StageTimer(profile, profile_dir, profile_memory, trace_file)
+
+    processed_order_names = []
+    packages_by_address = {}
+    packages = []
+    # quantities from every order and package are also kept in columnar stores so that
+    # all of the totals in the report come from one reduction over each store
+    orders = order_store()
+    shipped_packages = package_store()
+
+    SHOPIFY_ORDERS_CSV_DIR = "current_shopify_orders_csv"
+    current_shopify_orders_files = listdir("./" + SHOPIFY_ORDERS_CSV_DIR)
+    csv_files = sorted([f for f in current_shopify_orders_files if f.endswith('.csv')])
+    # customers that still pay through paypal are shipped to along with the Shopify orders.
+    # Receipts can be of any layout
+    PAYPAL_ORDERS_DIR = "current_paypal_orders_pdf"
+    paypal_receipt_files = [
+        PAYPAL_ORDERS_DIR + '/' + path.basename(f)
+        for f in receipt_files(path.dirname(path.realpath(__file__)) + '/' + PAYPAL_ORDERS_DIR)
+    ]
+    if not csv_files and not paypal_receipt_files:
+        raise Exception(f"At least one .csv file should exist under '{SHOPIFY_ORDERS_CSV_DIR}' (or a receipt under '{PAYPAL_ORDERS_DIR}')")
+    file_signatures = {
+        f: csv_file_signature(path.dirname(path.realpath(__file__)) + '/' + SHOPIFY_ORDERS_CSV_DIR + '/' + f)
+        for f in csv_files
+    }
+    file_signatures.update({
+        f: csv_file_signature(path.dirname(path.realpath(__file__)) + '/' + f)
+        for f in paypal_receipt_files
+    })
+
+    # orders that were processed by a previous run are skipped, as are exports that
+    # haven't changed at all since then
+    RUN_STATE_FILE = path.dirname(path.realpath(__file__)) + '/state/processed_orders.json'
+    run_state = {'files': {}, 'orders': set()} if full else load_run_state(RUN_STATE_FILE)
+    if run_state['orders']:
+        print("NOTE: skipping orders that were processed by previous runs (use --full to include them)")
+    csv_files = [
+        path.dirname(path.realpath(__file__)) + '/' + SHOPIFY_ORDERS_CSV_DIR + '/' + f
+        for f in csv_files if run_state['files'].get(f) != file_signatures[f]
+    ]
+    paypal_receipt_files = [
+        path.dirname(path.realpath(__file__)) + '/' + f
+        for f in paypal_receipt_files if run_state['files'].get(f) != file_signatures[f]
+    ]
+
+    # orders that have already been shipped (their exports and receipts having been moved
+    # into fulfilled/) are dropped as the exports are read, even with --full
+    fulfilled_orders = None
+    if not include_fulfilled:
+        with timer.stage('fulfilled_index'):
+            fulfilled_orders = load_fulfilled_orders()
+        if fulfilled_orders:
+            print(f"NOTE: skipping the {len(fulfilled_orders)} orders under fulfilled/ that have already been shipped (use --include-fulfilled to include them)")
+
+    # orders are streamed out of the exports one at a time so that the raw csv rows
+    # never have to be held in memory all at once
+    sku_catalog = load_sku_catalog(sku_catalog_file)
+    failed_receipt_files = []
+    # every order and package is also written to the order history, which is only
+    # committed once the whole run has succeeded
+    history = None
+    if keep_history:
+        from order_history import DEFAULT_ORDER_HISTORY_FILE, OrderHistory
+        history = OrderHistory(history_file or DEFAULT_ORDER_HISTORY_FILE)
+        history.begin_run()
+    with timer.stage('group_orders'):
+        # time spent reading the files is counted separately from grouping the orders
+        all_orders = timer.iterate('read_orders', read_all_orders(
+            csv_files, paypal_receipt_files, workers, frozenset(run_state['orders']), sku_catalog, failed_receipt_files, timer, fulfilled_orders,
+        ))
+        for order in all_orders:
+            orders.append(order)
+            processed_order_names.append(order.name)
+            if history is not None:
+                history.add_order(order)
+            # orders are grouped into packages by address as they come in
+            add_order_to_package(packages_by_address, order)
+    if timer.tracing:
+        timer.counter('orders', rows=orders.totals()['num_line_items'], orders=len(orders), addresses=len(packages_by_address))
+
+    # look for orders that are going to the same place written in slightly different ways
+    # (possibly under different customer names) before they end up in separate packages
+    with timer.stage('address_clusters'):
+        customer_names_by_address = {p.mailing_address: p.customer_name for p in packages_by_address.values()}
+        # addresses that have been warned about, by the cluster they were found in
+        address_clusters = {}
+        for cluster, similar_addresses in enumerate(find_address_clusters(customer_names_by_address)):
+            address_clusters.update(dict.fromkeys(similar_addresses, cluster))
+            print("WARNING: the following mailing addresses are very similar, indicating that these orders may need to be combined into a single package:")
+            for mailing_address in similar_addresses:
+                one_line_address = mailing_address.replace('\n', ', ')
+                print(f"    {customer_names_by_address[mailing_address]}: {one_line_address}")
+
+    with timer.stage('split_packages'):
+        for package in packages_by_address.values():
+            # DEBUG
+            #print(package)
+
+            split_packages = split_package(package)
+            packages.extend(split_packages)
+            shipped_packages.extend(split_packages)
+    if timer.tracing:
+        timer.counter('packages', packages=len(shipped_packages))
 
-            if (not placemat_package.is_shop_order) and \
-               placemat_package.num_total_placemats < 5 or \
-               (placemat_package.num_total_placemats == 5 and placemat_package.country == 'CA'):
-                # first class mail
-                placemat_package.shipping_class = 'first_class'
-            else:
-                # priority mail
-                placemat_package.shipping_class = 'priority'
-                placemat_package.shipping_cost = 10.00
-            packages.append(placemat_package)
-    
     # DEBUG
     #for package in packages:
-    #    print(package.__dict__)
+    #    print(package)
+
+    with timer.stage('totals'):
+        untracked_emails = [p.email_address for p in packages if (p.shipping_class == 'first_class' and p.num_hats == 0)]
+        tracked_emails = [p.email_address for p in packages if p.shipping_class == 'priority' or p.num_hats > 0]
 
-    untracked_emails = [p.email_address for p in packages if (p.shipping_class == 'first_class' and p.num_hats == 0)]
-    tracked_emails = [p.email_address for p in packages if p.shipping_class == 'priority' or p.num_hats > 0]
+        total_revenue = dollars(orders.totals()['retail_price_cents'])
+        orders_by_source = orders.counts('source')
 
-    # calculate numbers of items needed
-    penny_placemats_needed = sum([p.num_penny_placemats for p in packages])
-    nickel_placemats_needed = sum([p.num_nickel_placemats for p in packages])
-    silver_stacking_placemats_needed = sum([p.num_silver_stacking_placemats for p in packages])
-    dollar_coin_placemats_needed = sum([p.num_dollar_coin_placemats for p in packages])
-    hats_needed = sum([p.num_hats for p in packages])
+        # calculate numbers of items needed
+        package_totals = shipped_packages.totals()
+    penny_placemats_needed = package_totals['num_penny_placemats']
+    nickel_placemats_needed = package_totals['num_nickel_placemats']
+    silver_stacking_placemats_needed = package_totals['num_silver_stacking_placemats']
+    dollar_coin_placemats_needed = package_totals['num_dollar_coin_placemats']
+    hats_needed = package_totals['num_hats']
 
     # approximate cost of shipping
-    shipping_cost = sum([p.shipping_cost for p in packages])
+    shipping_cost = dollars(package_totals['shipping_cost_cents'])
 
     # sort packages primarily by number of placemats in ascending order, then by alphebtical order
-    sorted_packages = sorted(packages, key = lambda p: (p.num_total_placemats, p.order_code))
+    # (packages are built in the order that their addresses first came in, so ties are
+    # broken by the mailing address, as they were when orders were grouped by sorted address)
+    with timer.stage('sort_packages'):
+        sorted_packages = sorted(packages, key = lambda p: (p.num_total_placemats, p.order_code, p.mailing_address))
 
     # debug
     #for p in sorted_packages:
-    #    print(p.__dict__)
-
-    duplicate_name_packages = {}
-    for i in sorted_packages:
-        for j in sorted_packages:
-            if i.customer_name == j.customer_name and i.mailing_address != j.mailing_address:
-                if duplicate_name_packages.get(i.customer_name):
-                    duplicate_name_packages[i.customer_name].extend([i.mailing_address, j.mailing_address])
-                else:
-                    duplicate_name_packages[i.customer_name] = [i.mailing_address, j.mailing_address]
-    for name in duplicate_name_packages.keys():
-        duplicate_name_packages[name] = list(set(duplicate_name_packages[name]))
-
-    print("\nADDRESSES\n=============================")
-    for p in sorted_packages:
-        print(  
+    #    print(p)
+
+    with timer.stage('duplicate_names'):
+        duplicate_name_packages = find_duplicate_name_packages(sorted_packages)
+
+    with timer.stage('print_report'):
+        print("\nADDRESSES\n=============================")
+        for p in sorted_packages:
+            print(  
 """
 Order Type: %s%s
 %s
 %s
 """ %       (
-                p.order_code,
-                ' (tracked)' if (p.shipping_class == 'priority' or p.num_hats > 0) else '',
-                p.customer_name,
-                p.mailing_address
+                    p.order_code,
+                    ' (tracked)' if (p.shipping_class == 'priority' or p.num_hats > 0) else '',
+                    p.customer_name,
+                    p.mailing_address
+                )
             )
-        )
-    print("=============================\n")
+        print("=============================\n")
 
-    # print out all important stats
-    print(
+        # print out all important stats
+        if orders_by_source.get('paypal'):
+            print("Orders: %d from Shopify, %d from paypal" % (orders_by_source.get('shopify', 0), orders_by_source['paypal']))
+        print(
 """
 TOTAL REVENUE: ${:,.2f}
 
@@ -324,28 +783,50 @@ Total Packages: {}
 Shipping Cost: ${:,.2f}
 =============================
 """.format(total_revenue, penny_placemats_needed, nickel_placemats_needed, 
-           silver_stacking_placemats_needed, dollar_coin_placemats_needed, hats_needed,
-           len(packages), shipping_cost)
-    )
-
-    if not all(isinstance(e, str) for e in untracked_emails):
-        print("WARNING: not all untracked emails were parsed properly. See warnings above for more info\n")
-        untracked_emails = [e for e in untracked_emails if isinstance(e, str)]
-    print('untracked emails: %s\n' % ', '.join(untracked_emails))
-    if not all(isinstance(e, str) for e in tracked_emails):
-        print("WARNING: not all tracked emails were parsed properly. See warnings above for more info\n")
-        tracked_emails = [e for e in tracked_emails if isinstance(e, str)]
-    print('tracked emails: %s\n' % ', '.join(tracked_emails))
+               silver_stacking_placemats_needed, dollar_coin_placemats_needed, hats_needed,
+               len(shipped_packages), shipping_cost)
+        )
 
-    if duplicate_name_packages:
+        if not all(isinstance(e, str) for e in untracked_emails):
+            print("WARNING: not all untracked emails were parsed properly. See warnings above for more info\n")
+            untracked_emails = [e for e in untracked_emails if isinstance(e, str)]
+        print('untracked emails: %s\n' % ', '.join(untracked_emails))
+        if not all(isinstance(e, str) for e in tracked_emails):
+            print("WARNING: not all tracked emails were parsed properly. See warnings above for more info\n")
+            tracked_emails = [e for e in tracked_emails if isinstance(e, str)]
+        print('tracked emails: %s\n' % ', '.join(tracked_emails))
+
+        # the clustering above skips addresses with different house numbers, which for the
+        # same customer are more likely a typo than a neighbor, so the two addresses of a
+        # customer are compared again here (unless they were already found to be similar)
         for name, mailing_addresses in duplicate_name_packages.items():
             if len(mailing_addresses) == 2:
-                address_similarity_ratio = get_address_similarity_ratio(mailing_addresses[0], mailing_addresses[1])
+                a1, a2 = mailing_addresses
+                if a1 in address_clusters and address_clusters.get(a1) == address_clusters.get(a2):
+                    continue
+                address_similarity_ratio = get_address_similarity_ratio(a1, a2)
                 if address_similarity_ratio > 0.7:
                     print(f"WARNING: mailing addresses for customer '{name}' have a high similarity ratio ({address_similarity_ratio:.2f}) indicating that these orders may need to be combined into a single package.")
             else:
                 print(f"WARNING: customer '{name}' has more than 2 mailing addresses that are different. Be sure to analyze this case carefully.")
 
+    # remember what was processed so that the next run only picks up new orders
+    run_state['orders'].update(processed_order_names)
+    # receipts that couldn't be parsed are tried again by the next run
+    for f in failed_receipt_files:
+        del file_signatures[PAYPAL_ORDERS_DIR + '/' + path.basename(f)]
+    run_state['files'].update(file_signatures)
+    if history is not None:
+        with timer.stage('save_history'):
+            history.add_packages(packages)
+            history.commit_run()
+            history.close()
+    with timer.stage('save_state'):
+        save_run_state(RUN_STATE_FILE, run_state)
+
+    if timer.enabled:
+        timer.print_report()
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,154 @@
+'''Persistent cache of the text extracted from paypal receipts, keyed by a hash of each receipt's contents'''
+
+import hashlib
+import threading
+import zlib
+from os import getpid, listdir, makedirs, path, remove, replace, stat, utime
+
+
+DEFAULT_RECEIPT_CACHE_DIR = path.dirname(path.realpath(__file__)) + '/state/receipt_cache'
+# once the compressed text of all cached receipts grows past this size, the least
+# recently used entries are evicted
+DEFAULT_MAX_CACHE_BYTES = 256 * 1024 * 1024
+# evicting trims the cache a little below its limit, so that a full cache isn't listed
+# and trimmed again on every write that follows
+EVICT_TO_FRACTION = 0.9
+CACHE_FILE_EXTENSION = '.txt.z'
+
+# bytes in each cache directory as last counted by this process, so that every cache
+# object (and thread) in a process adds to the same running total
+_cache_bytes = {}
+_cache_bytes_lock = threading.Lock()
+
+
+def file_hash(filename):
+    '''sha256 of a file's contents.'''
+    sha256 = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def extract_pdf_text(pdf_file):
+    '''Text of a paypal receipt pdf, extracted the same way the process_shipment scripts do it.'''
+    import pdftotext
+    with open(pdf_file, 'rb') as f:
+        pdf = pdftotext.PDF(f)
+    # remove left-to-right markers after coverting pdf to text
+    return "\n\n".join(pdf).replace('\u200E', '')
+
+
+class ReceiptTextCache():
+    '''Stores the extracted text of each receipt compressed on disk, one file per receipt.
+
+    Receipts are looked up by the hash of their contents, so a receipt is only ever
+    converted again if the file itself changes. Whenever an entry that is written takes
+    the cache past max_bytes, the least recently used entries are evicted, so every
+    program that reads receipts keeps the cache in bounds. It is safe to share a cache
+    between threads and processes.
+    '''
+    def __init__(self, cache_dir=DEFAULT_RECEIPT_CACHE_DIR, max_bytes=DEFAULT_MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        makedirs(cache_dir, exist_ok=True)
+
+    def _cache_file(self, key):
+        return path.join(self.cache_dir, key + CACHE_FILE_EXTENSION)
+
+    def get(self, key):
+        '''Cached text for a receipt hash, or None if it hasn't been cached.'''
+        cache_file = self._cache_file(key)
+        try:
+            with open(cache_file, 'rb') as f:
+                text = zlib.decompress(f.read()).decode('utf-8')
+        except (FileNotFoundError, zlib.error):
+            with self._lock:
+                self.misses += 1
+            return None
+        # the modification time doubles as the last time the entry was used
+        utime(cache_file)
+        with self._lock:
+            self.hits += 1
+        return text
+
+    def put(self, key, text):
+        cache_file = self._cache_file(key)
+        # write to a temporary file first so that readers never see a partial entry
+        temp_file = '%s.%d.%d.tmp' % (cache_file, getpid(), threading.get_ident())
+        compressed_text = zlib.compress(text.encode('utf-8'))
+        with open(temp_file, 'wb') as f:
+            f.write(compressed_text)
+        replace(temp_file, cache_file)
+        with _cache_bytes_lock:
+            if self.cache_dir in _cache_bytes:
+                _cache_bytes[self.cache_dir] += len(compressed_text)
+            else:
+                # the first entry that this process writes counts everything already there
+                _cache_bytes[self.cache_dir] = sum(size for _, size, _ in self._entries())
+            over_limit = _cache_bytes[self.cache_dir] > self.max_bytes
+        if over_limit:
+            self.evict()
+
+    def text(self, receipt_file, extract_text):
+        '''Text of receipt_file, only calling extract_text(receipt_file) if it isn't cached yet.'''
+        # different extractors produce different text for the same receipt
+        key = extract_text.__name__ + '-' + file_hash(receipt_file)
+        text = self.get(key)
+        if text is None:
+            text = extract_text(receipt_file)
+            self.put(key, text)
+        return text
+
+    def _entries(self):
+        entries = []
+        for filename in listdir(self.cache_dir):
+            if filename.endswith(CACHE_FILE_EXTENSION):
+                try:
+                    file_stat = stat(path.join(self.cache_dir, filename))
+                except FileNotFoundError:
+                    # evicted by another process in the meantime
+                    continue
+                entries.append((file_stat.st_mtime_ns, file_stat.st_size, filename))
+        return entries
+
+    def evict(self):
+        '''Remove the least recently used entries until the cache fits in max_bytes (with some room to spare).'''
+        target_bytes = self.max_bytes * EVICT_TO_FRACTION
+        with _cache_bytes_lock:
+            entries = sorted(self._entries())
+            cache_bytes = sum(size for _, size, _ in entries)
+            for _, size, filename in entries:
+                if cache_bytes <= target_bytes:
+                    break
+                try:
+                    remove(path.join(self.cache_dir, filename))
+                    self.evictions += 1
+                except FileNotFoundError:
+                    pass
+                cache_bytes -= size
+            _cache_bytes[self.cache_dir] = cache_bytes
+
+    def stats(self):
+        entries = self._entries()
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'entries': len(entries),
+            'bytes': sum(size for _, size, _ in entries),
+        }
+
+
+def read_receipt_text(receipt_file, cache=None):
+    '''Text of a paypal receipt that is either a .pdf or an already converted .txt file.'''
+    if receipt_file.endswith('.txt'):
+        with open(receipt_file, 'rb') as f:
+            return f.read().decode('utf-8')
+    if cache is None:
+        return extract_pdf_text(receipt_file)
+    return cache.text(receipt_file, extract_pdf_text)
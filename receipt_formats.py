@@ -0,0 +1,206 @@
+'''Detects which generation of paypal receipt a text is and parses it with the matching parser,
+so that a directory holding receipts of every layout can be processed in one run'''
+
+import re
+from collections import Counter, namedtuple
+import click
+from legacy_receipts import SHIPMENT_CLASSIFIER, V1_CLASSIFIER
+from money import dollars, parse_cents
+from paypal_receipts import COLUMN_GAP, PaypalOrder, order_spans, parse_receipt, receipt_files, split_country
+from receipt_cache import ReceiptTextCache, read_receipt_text
+
+
+# The layouts, newest first. A receipt is given to the first format whose markers all
+# appear in it, so each receipt is only ever parsed once
+#   v5: "Quin's Coins" receipts with item codes, read by process_shipment_v5.py and _v6.py
+#   v4: 'Quinlan Productions LLC' receipts with item codes, read by process_shipment_v4.py.
+#       v2 receipts come from the same paypal invoice template (down to the 'Shipping &
+#       Handling' line), so only the 'Item Code' column header of the item table tells them apart
+#   v1: 'Ship to:'/'Address:' receipts, read by process_orders.py and process_shipment.py
+#   v2: 'Quinlan Productions LLC' receipts without item codes, read by process_shipment_v2.py and _v3.py
+ReceiptFormat = namedtuple('ReceiptFormat', ['name', 'markers', 'parse_receipt'])
+
+SELLER_NAME = 'Quinlan Productions LLC'
+SELLER_EMAIL = 'quinscoins@gmail.com'
+# price (in cents) of each order code that receipts without item codes can have
+ORDER_CODE_PRICES = {
+    'P1': 1500,
+    'N1': 1500,
+    'S1': 1500,
+    'P2': 2500,
+    'N2': 2500,
+    'S2': 2500,
+    'P1N1': 2500,
+    'P3': 3000,
+    'N3': 3000,
+    'P1N1S1': 4000,
+    'H1': 2499,
+    'H2': 4998,
+}
+# until dollar coin placemats came out (process_shipment_v6.py), the M1 variety pack held
+# one penny, nickel and silver stacking placemat. Every v4 receipt is from before then,
+# while v5 receipts look the same before and after, so on those the three placemat pack
+# is told apart by the price it sold for
+THREE_PLACEMAT_VARIETY_PACK_ITEMS = ('P1', 'N1', 'S1')
+THREE_PLACEMAT_VARIETY_PACK_PRICE_CENTS = ORDER_CODE_PRICES['P1N1S1']
+
+
+def order_code_items(order_code):
+    '''(item code, quantity) of each product in an order code such as 'P1N1S1' or 'H2'.'''
+    return [(product + '1', int(quantity)) for product, quantity in re.findall(r'([A-Z])(\d+)', order_code)]
+
+
+def three_placemat_variety_packs(items):
+    '''items with each M1 variety pack replaced by the three placemats that it used to hold.
+
+    The shared sku catalog describes the variety pack that is sold now, so older variety
+    packs are expanded by the parsers of the formats that they show up in.
+    '''
+    expanded_items = []
+    for item_code, quantity in items:
+        if item_code == 'M1':
+            expanded_items.extend((placemat, quantity) for placemat in THREE_PLACEMAT_VARIETY_PACK_ITEMS)
+        else:
+            expanded_items.append((item_code, quantity))
+    return expanded_items
+
+
+def variety_pack_price_cents(order_text):
+    '''Price of a single M1 variety pack in the item table of an order, or None if it has none.'''
+    match = re.search(r'\sM1\s+\d+\s+\$([\d,]+\.\d\d)', order_text)
+    return parse_cents(match.group(1)) if match else None
+
+
+def parse_email_address(order_text):
+    email_address = order_text.split(SELLER_NAME)[1].split(SELLER_EMAIL)[0].strip()
+    return email_address if '@' in email_address else None
+
+
+def buyer_column(lines):
+    return '\n'.join([l.lstrip().split(COLUMN_GAP)[0] for l in lines])
+
+
+def classified_order(order_text, classifier):
+    '''PaypalOrder with the products and price of a receipt without item codes.'''
+    order = PaypalOrder()
+    order_code = classifier.order_code(order_text)
+    if order_code is None:
+        raise Exception('unprocessable order')
+    order.items = order_code_items(order_code)
+    order.retail_price_cents = ORDER_CODE_PRICES[order_code]
+    return order
+
+
+def parse_v1_receipt(text):
+    orders = []
+    for start, end in order_spans(text, 'Ship to:'):
+        order_text = text[start:end]
+        order = classified_order(order_text, V1_CLASSIFIER)
+        order.customer_name = order_text.split("Ship from:", 1)[0].strip().title()
+        order.email_address = parse_email_address(order_text)
+        order.mailing_address, order.country = split_country(order_text.split('Address:', 1)[1])
+        orders.append(order)
+    return orders
+
+
+def parse_v2_receipt(text):
+    orders = []
+    for start, end in order_spans(text):
+        order_text = text[start:end]
+        order = classified_order(order_text, SHIPMENT_CLASSIFIER)
+        order.customer_name = order_text.split("Ship from", 1)[0].strip().title()
+        order.email_address = parse_email_address(order_text)
+        address_lines = order_text.split('Address', 1)[1].split('Transaction ID', 1)[0].split('\n')
+        order.mailing_address, order.country = split_country(buyer_column(address_lines))
+        orders.append(order)
+    return orders
+
+
+def parse_v4_receipt(text):
+    orders = []
+    for start, end in order_spans(text):
+        order_text = text[start:end]
+        order = PaypalOrder()
+        # item codes lead each line of the item table
+        order_items = order_text.split("Amount", 1)[1].split("Shipping & Handling", 1)[0].strip()
+        for item in order_items.splitlines():
+            item_details = item.strip().split()
+            order.items.append((item_details[0], int(item_details[-3])))
+        order.items = three_placemat_variety_packs(order.items)
+        order.customer_name = order_text.split("Ship from", 1)[0].strip().title()
+        order.email_address = parse_email_address(order_text)
+        address_lines = order_text.split('Address', 1)[1].split('Transaction ID', 1)[0].split('\n')
+        order.mailing_address, order.country = split_country(buyer_column(address_lines[0:-1]))
+        # total retail price is the 4th value from the end
+        order.retail_price_cents = parse_cents(order_text.split()[-4])
+        orders.append(order)
+    return orders
+
+
+def parse_v5_receipt(text):
+    orders = parse_receipt(text)
+    for (start, end), order in zip(order_spans(text), orders):
+        if variety_pack_price_cents(text[start:end]) == THREE_PLACEMAT_VARIETY_PACK_PRICE_CENTS:
+            order.items = three_placemat_variety_packs(order.items)
+    return orders
+
+
+RECEIPT_FORMATS = (
+    ReceiptFormat('v5', ("Quin's Coins", 'This is not a bill.'), parse_v5_receipt),
+    ReceiptFormat('v4', (SELLER_NAME, 'Item Code'), parse_v4_receipt),
+    ReceiptFormat('v1', ('Ship to:', 'Address:'), parse_v1_receipt),
+    ReceiptFormat('v2', (SELLER_NAME, 'Ship to'), parse_v2_receipt),
+)
+
+
+def detect_receipt_format(text):
+    '''The ReceiptFormat of the text of a receipt, or None if it matches none of them.'''
+    for receipt_format in RECEIPT_FORMATS:
+        if all(marker in text for marker in receipt_format.markers):
+            return receipt_format
+    return None
+
+
+def parse_any_receipt(text):
+    '''(format name, orders) of the text of a receipt of any layout.'''
+    receipt_format = detect_receipt_format(text)
+    if receipt_format is None:
+        raise Exception('unknown receipt format')
+    return receipt_format.name, receipt_format.parse_receipt(text)
+
+
+def read_receipt_orders(receipt_dir, cache=None):
+    '''Yields (receipt file, format name, orders) for every receipt in receipt_dir, whatever its layout.
+
+    Receipts that can't be read or parsed are reported and skipped.
+    '''
+    for receipt_file in receipt_files(receipt_dir):
+        try:
+            format_name, orders = parse_any_receipt(read_receipt_text(receipt_file, cache))
+        except Exception as e:
+            print("unable to process file '%s': %s" % (receipt_file, e))
+            continue
+        yield receipt_file, format_name, orders
+
+
+@click.command()
+@click.option('--in-dir', default='all_paypal_orders_pdf', show_default=True, help="directory of paypal receipts (.pdf or .txt) of any layout")
+@click.option('--cache/--no-cache', default=True, show_default=True, help="re-use text extracted from identical receipts by earlier runs")
+def main(in_dir, cache):
+    cache = ReceiptTextCache() if cache else None
+    receipts_by_format = Counter()
+    orders_by_format = Counter()
+    revenue_by_format = Counter()
+    for _, format_name, orders in read_receipt_orders(in_dir, cache):
+        receipts_by_format[format_name] += 1
+        orders_by_format[format_name] += len(orders)
+        revenue_by_format[format_name] += sum(o.retail_price_cents for o in orders)
+    print(f"\n{'format':<10}{'receipts':>10}{'orders':>10}{'revenue':>14}")
+    for receipt_format in RECEIPT_FORMATS:
+        name = receipt_format.name
+        print(f"{name:<10}{receipts_by_format[name]:>10}{orders_by_format[name]:>10}{dollars(revenue_by_format[name]):>14,.2f}")
+    print(f"{'total':<10}{sum(receipts_by_format.values()):>10}{sum(orders_by_format.values()):>10}{dollars(sum(revenue_by_format.values())):>14,.2f}")
+
+
+if __name__ == "__main__":
+    main()
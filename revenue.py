@@ -0,0 +1,117 @@
+'''Approximates the total revenue (and paypal fees) of every receipt in all_paypal_orders_pdf,
+splitting the receipts between several processes and adding up what each of them found'''
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from os import cpu_count
+import click
+from money import dollars, total_paypal_fee_cents
+from paypal_receipts import catalog_items, receipt_files
+from receipt_cache import ReceiptTextCache, read_receipt_text
+from receipt_formats import parse_any_receipt
+from sku_catalog import DEFAULT_SKU_CATALOG_FILE, PRODUCTS, load_sku_catalog
+
+
+# receipts are handed to the workers a few chunks at a time per worker, so that one
+# worker stuck on slow receipts doesn't hold up the whole job
+CHUNKS_PER_WORKER = 4
+
+
+class RevenueTotals():
+    '''Revenue, paypal fees and units of each product sold, summed over some number of receipts.
+
+    Money is kept in whole cents, so totals added up in any order (or in any number of
+    processes) come out exactly the same.
+    '''
+    def __init__(self):
+        self.num_receipts = 0
+        self.num_orders = 0
+        self.revenue_cents = 0
+        self.paypal_fee_cents = 0
+        self.units = [0] * len(PRODUCTS)
+        # (receipt file, error) of each receipt that couldn't be read or parsed
+        self.failures = []
+
+    def add_receipt(self, orders, sku_catalog):
+        # every order is expanded before anything is added, so a receipt with an unknown
+        # item is either counted in full or not at all
+        units_by_order = [sku_catalog.expand_many(*catalog_items(o.items)) for o in orders]
+        prices_cents = [o.retail_price_cents for o in orders]
+        self.revenue_cents += sum(prices_cents)
+        self.paypal_fee_cents += total_paypal_fee_cents(prices_cents)
+        for units in units_by_order:
+            self.units = [total + n for total, n in zip(self.units, units)]
+        self.num_receipts += 1
+        self.num_orders += len(orders)
+
+    def merge(self, other):
+        self.num_receipts += other.num_receipts
+        self.num_orders += other.num_orders
+        self.revenue_cents += other.revenue_cents
+        self.paypal_fee_cents += other.paypal_fee_cents
+        self.units = [total + n for total, n in zip(self.units, other.units)]
+        self.failures.extend(other.failures)
+        return self
+
+
+def receipt_totals(receipt_files, sku_catalog, use_cache=True):
+    '''Totals of a chunk of receipts (run inside a worker process).
+
+    A receipt that can't be read or parsed is recorded as a failure, and the rest of the
+    chunk is still added up.
+    '''
+    cache = ReceiptTextCache() if use_cache else None
+    totals = RevenueTotals()
+    for receipt_file in receipt_files:
+        try:
+            _, orders = parse_any_receipt(read_receipt_text(receipt_file, cache))
+            totals.add_receipt(orders, sku_catalog)
+        except Exception as e:
+            totals.failures.append((receipt_file, str(e)))
+    return totals
+
+
+def total_revenue(receipt_dir, workers=None, sku_catalog=None, use_cache=True):
+    '''Totals of every receipt in receipt_dir, added up by a pool of worker processes.'''
+    sku_catalog = sku_catalog or load_sku_catalog()
+    files = receipt_files(receipt_dir)
+    workers = workers or cpu_count()
+    num_chunks = min(len(files), workers * CHUNKS_PER_WORKER)
+    chunks = [files[i::num_chunks] for i in range(num_chunks)]
+    totals = RevenueTotals()
+    if workers == 1 or num_chunks <= 1:
+        for chunk in chunks:
+            totals.merge(receipt_totals(chunk, sku_catalog, use_cache))
+        return totals
+    with ProcessPoolExecutor(max_workers=min(workers, num_chunks)) as executor:
+        for chunk_totals in executor.map(receipt_totals, chunks, repeat(sku_catalog), repeat(use_cache)):
+            totals.merge(chunk_totals)
+    return totals
+
+
+@click.command()
+@click.option('--in-dir', default='all_paypal_orders_pdf', show_default=True, help="directory of paypal receipts (.pdf or .txt) of any layout")
+@click.option('--workers', '-j', type=int, default=None, help="number of processes to split the receipts between (defaults to the number of CPUs)")
+@click.option('--sku-catalog', 'sku_catalog_file', type=click.Path(exists=True, dir_okay=False), default=DEFAULT_SKU_CATALOG_FILE, help="json file describing the products that make up each sku")
+@click.option('--cache/--no-cache', default=True, show_default=True, help="re-use text extracted from identical receipts by earlier runs")
+def main(in_dir, workers, sku_catalog_file, cache):
+    start = time.perf_counter()
+    totals = total_revenue(in_dir, workers, load_sku_catalog(sku_catalog_file), cache)
+    elapsed = time.perf_counter() - start
+    for receipt_file, error in sorted(totals.failures):
+        print("unable to process file '%s': %s" % (receipt_file, error))
+    print(
+"""
+TOTAL REVENUE: ${:,.2f}
+ESTIMATED REVENUE AFTER PAYPAL FEES: ${:,.2f}
+PAYPAL FEES: ${:,.2f}
+""".format(dollars(totals.revenue_cents), dollars(totals.revenue_cents - totals.paypal_fee_cents), dollars(totals.paypal_fee_cents))
+    )
+    for product, units in zip(PRODUCTS, totals.units):
+        print(f"{product.replace('_', ' ').title()} Sold: {units}")
+    print(f"\n{totals.num_orders} orders on {totals.num_receipts} receipts ({len(totals.failures)} could not be read) in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
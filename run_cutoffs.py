@@ -0,0 +1,87 @@
+'''Finds the receipt where each placemat run fills up, so that run cutoffs no longer have to be
+found by copying receipts into temp_paypal_orders_pdf and re-running until the count is right'''
+
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+from os import path
+import click
+from convert_orders_to_txt import natural_sort_key
+from paypal_receipts import catalog_items, receipt_files
+from receipt_cache import ReceiptTextCache, read_receipt_text
+from receipt_formats import parse_any_receipt
+from sku_catalog import DEFAULT_SKU_CATALOG_FILE, PRODUCTS, load_sku_catalog
+
+
+class OrderStream():
+    '''Every order on the receipts in a directory, oldest first, with a running total of each product.
+
+    Receipts are read in natural sort order of their file names (the order that paypal
+    numbers them in), so totals[product][i] is the number of that product sold by orders
+    0 through i. The receipts are only read once, after which any cutoff is a binary search.
+    '''
+    def __init__(self, receipt_dir, sku_catalog=None, cache=None):
+        sku_catalog = sku_catalog or load_sku_catalog()
+        # (receipt file, position of the order on the receipt, customer name) of each order
+        self.orders = []
+        # receipts that couldn't be read or parsed, which are left out of the totals
+        self.failed_receipt_files = []
+        quantities = []
+        for receipt_file in sorted(receipt_files(receipt_dir), key=lambda f: natural_sort_key(path.basename(f))):
+            try:
+                _, paypal_orders = parse_any_receipt(read_receipt_text(receipt_file, cache))
+                receipt_quantities = [sku_catalog.expand_many(*catalog_items(o.items)) for o in paypal_orders]
+            except Exception as e:
+                print("unable to process file '%s': %s" % (receipt_file, e))
+                self.failed_receipt_files.append(receipt_file)
+                continue
+            for i, (paypal_order, product_quantities) in enumerate(zip(paypal_orders, receipt_quantities)):
+                self.orders.append((receipt_file, i + 1, paypal_order.customer_name))
+                quantities.append(product_quantities)
+        self.totals = {
+            product: array('q', accumulate(q[i] for q in quantities))
+            for i, product in enumerate(PRODUCTS)
+        }
+
+    def __len__(self):
+        return len(self.orders)
+
+    def total(self, product):
+        totals = self.totals[product]
+        return totals[-1] if totals else 0
+
+    def cutoff(self, product, quantity):
+        '''Index of the order that brings the total of product up to quantity, or None if
+        every order together doesn't sell that many.'''
+        i = bisect_left(self.totals[product], quantity)
+        return i if i < len(self.orders) else None
+
+
+@click.command()
+@click.option('--in-dir', default='all_paypal_orders_pdf', show_default=True, help="directory of paypal receipts (.pdf or .txt) of any layout")
+@click.option('--product', type=click.Choice(PRODUCTS), default='penny_placemats', show_default=True, help="product that the runs are made of")
+@click.option('--run-size', type=click.IntRange(min=1), required=True, help="number of the product in each run")
+@click.option('--runs', type=click.IntRange(min=1), default=1, show_default=True, help="number of consecutive runs to find cutoffs for")
+@click.option('--sku-catalog', 'sku_catalog_file', type=click.Path(exists=True, dir_okay=False), default=DEFAULT_SKU_CATALOG_FILE, help="json file describing the products that make up each sku")
+@click.option('--cache/--no-cache', default=True, show_default=True, help="re-use text extracted from identical receipts by earlier runs")
+def main(in_dir, product, run_size, runs, sku_catalog_file, cache):
+    orders = OrderStream(in_dir, load_sku_catalog(sku_catalog_file), ReceiptTextCache() if cache else None)
+    print(f"{len(orders)} orders, {orders.total(product)} {product.replace('_', ' ')} in total\n")
+    previous_cutoff = -1
+    for run in range(1, runs + 1):
+        cutoff = orders.cutoff(product, run * run_size)
+        if cutoff is None:
+            remaining = orders.total(product) - (run - 1) * run_size
+            print(f"run {run}: not filled yet, {remaining} of {run_size} sold")
+            break
+        receipt_file, position, customer_name = orders.orders[cutoff]
+        # the last order of a run can take it past run_size, and the rest of that order
+        # counts towards the next run
+        overflow = orders.totals[product][cutoff] - run * run_size
+        print(f"run {run}: filled by order {cutoff + 1} ({customer_name}, order {position} on {path.basename(receipt_file)})"
+              + (f", {overflow} over" if overflow else '') + f", {cutoff - previous_cutoff} orders")
+        previous_cutoff = cutoff
+
+
+if __name__ == "__main__":
+    main()
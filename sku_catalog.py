@@ -0,0 +1,51 @@
+'''Catalog of the products that make up each SKU sold in the shop'''
+
+import json
+from os import path
+
+
+# every product that gets packaged, in the order used by product quantity vectors
+PRODUCTS = (
+    'penny_placemats',
+    'nickel_placemats',
+    'silver_stacking_placemats',
+    'dollar_coin_placemats',
+    'hats',
+)
+# the attributes of ShopifyOrder and Package that hold the quantity of each product
+PRODUCT_FIELDS = tuple('num_' + p for p in PRODUCTS)
+
+DEFAULT_SKU_CATALOG_FILE = path.dirname(path.realpath(__file__)) + '/sku_catalog.json'
+
+
+class SkuCatalog():
+    '''Maps each SKU to a vector of product quantities (one entry for each of PRODUCTS).
+
+    Bundles such as the M1 variety pack are just SKUs with more than one product in
+    their vector, so adding a new product or bundle only means adding it to the catalog file.
+    '''
+    def __init__(self, products_by_sku):
+        self.vectors = {}
+        for sku, products in products_by_sku.items():
+            unknown_products = set(products) - set(PRODUCTS)
+            if unknown_products:
+                raise Exception(f"Unknown products for sku {sku}: {', '.join(sorted(unknown_products))}")
+            self.vectors[sku] = tuple(products.get(p, 0) for p in PRODUCTS)
+
+    def vector(self, sku):
+        vector = self.vectors.get(sku)
+        if vector is None:
+            raise Exception(f'Unknown sku: {sku}')
+        return vector
+
+    def expand_many(self, skus, quantities):
+        '''Total product quantities of the line items of an order.'''
+        totals = [0] * len(PRODUCTS)
+        for sku, quantity in zip(skus, quantities):
+            totals = [total + n * quantity for total, n in zip(totals, self.vector(sku))]
+        return totals
+
+
+def load_sku_catalog(catalog_file=DEFAULT_SKU_CATALOG_FILE):
+    with open(catalog_file) as f:
+        return SkuCatalog(json.load(f))
@@ -0,0 +1,215 @@
+'''Timing (and optionally cProfile, tracemalloc and Chrome trace) instrumentation for the stages of a run
+
+cProfile and tracemalloc are only imported once they are asked for, so that runs without
+--profile don't pay for importing them.
+'''
+
+import json
+import time
+from contextlib import contextmanager, nullcontext
+from os import getpid, makedirs, path
+
+
+# returned by StageTimer.stage when timing is off, so a disabled stage costs one method call
+_NO_STAGE = nullcontext()
+# trace viewer threads that the spans of the main process are drawn on
+STAGE_THREAD = 1
+INGEST_THREAD = 2
+
+
+def trace_timestamp():
+    '''Microseconds since the epoch, which (unlike perf_counter) can be compared between processes.'''
+    return time.time_ns() / 1000
+
+
+def traced_call(function, *args):
+    '''Call function(*args), returning (its result, (pid, start, duration)) so that a span
+    can be recorded for calls that run inside worker processes.'''
+    start = trace_timestamp()
+    result = function(*args)
+    return result, (getpid(), start, trace_timestamp() - start)
+
+
+class StageRecord():
+    '''Time spent in a single stage of a run.'''
+    __slots__ = ('name', 'seconds', 'peak_memory', 'profile')
+
+    def __init__(self, name):
+        self.name = name
+        self.seconds = 0.0
+        # peak bytes allocated while the stage ran, if memory is being traced
+        self.peak_memory = None
+        self.profile = None
+
+
+class StageTimer():
+    '''Times each stage of a run, in the order that the stages are first entered.
+
+    Stages are entered with `with timer.stage(name):`. Orders are streamed out of the
+    files while they are grouped, so the time spent producing the items of an iterable
+    can also be split out of the stage that consumes it with timer.iterate(name, iterable).
+
+    With profile_dir set each stage is also run under cProfile and its stats are written
+    to <profile_dir>/<stage>.prof, and with trace_memory the peak memory allocated during
+    each stage is recorded with tracemalloc. With trace_file set, a span for every stage
+    (and every span() and counter() recorded along the way) is written to trace_file in
+    the Chrome trace event format, which chrome://tracing and Perfetto can load. When the
+    timer isn't enabled, stage() and iterate() do nothing.
+    '''
+    def __init__(self, enabled=False, profile_dir=None, trace_memory=False, trace_file=None):
+        self.enabled = enabled or profile_dir is not None or trace_memory or trace_file is not None
+        self.profile_dir = profile_dir
+        self.trace_memory = trace_memory
+        self.trace_file = trace_file
+        self.tracing = trace_file is not None
+        self.trace_events = []
+        self.records = {}
+        self._current = None
+
+    def _record(self, name):
+        record = self.records.get(name)
+        if record is None:
+            record = self.records[name] = StageRecord(name)
+            if self.profile_dir is not None:
+                import cProfile
+                record.profile = cProfile.Profile()
+        return record
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NO_STAGE
+        return self._stage(name)
+
+    @contextmanager
+    def _stage(self, name):
+        record = self._record(name)
+        previous, self._current = self._current, record
+        if self.trace_memory:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        if record.profile is not None:
+            record.profile.enable()
+        start_timestamp = trace_timestamp()
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            elapsed = time.perf_counter() - start
+            record.seconds += elapsed
+            if self.tracing:
+                self.span(name, start_timestamp, elapsed * 1e6)
+            if record.profile is not None:
+                record.profile.disable()
+            if self.trace_memory:
+                record.peak_memory = max(record.peak_memory or 0, tracemalloc.get_traced_memory()[1])
+            self._current = previous
+
+    def iterate(self, name, iterable):
+        '''Iterate over iterable, counting the time spent producing each item towards stage name
+        instead of towards the stage that is consuming them.'''
+        if not self.enabled:
+            return iterable
+        return self._iterate(name, iterable)
+
+    def _iterate(self, name, iterable):
+        consumer = self._current
+        if name not in self.records and consumer is not None:
+            # list the stage producing the items before the stage that consumes them
+            names = list(self.records)
+            record = self._record(name)
+            names.insert(names.index(consumer.name), name)
+            self.records = {n: self.records[n] for n in names}
+        record = self._record(name)
+        iterator = iter(iterable)
+        # the items are produced in between being consumed, so the whole iteration is
+        # drawn as a single span on a thread of its own
+        start_timestamp = trace_timestamp()
+        while True:
+            consumer = self._current
+            if consumer is not None and consumer.profile is not None:
+                consumer.profile.disable()
+            if record.profile is not None:
+                record.profile.enable()
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                if self.tracing:
+                    self.span(name, start_timestamp, trace_timestamp() - start_timestamp, tid=INGEST_THREAD)
+                return
+            finally:
+                elapsed = time.perf_counter() - start
+                record.seconds += elapsed
+                if consumer is not None:
+                    consumer.seconds -= elapsed
+                if record.profile is not None:
+                    record.profile.disable()
+                if consumer is not None and consumer.profile is not None:
+                    consumer.profile.enable()
+            yield item
+
+    def span(self, name, start, duration, pid=None, tid=STAGE_THREAD, **args):
+        '''Record a span that started at start (a trace_timestamp()) and lasted duration microseconds.'''
+        if self.tracing:
+            self.trace_events.append({
+                'name': name, 'ph': 'X', 'ts': start, 'dur': duration,
+                'pid': pid or getpid(), 'tid': tid, 'args': args,
+            })
+
+    def counter(self, name, **values):
+        '''Record the current value of one or more counters (such as rows, orders or packages).'''
+        if self.tracing:
+            self.trace_events.append({'name': name, 'ph': 'C', 'ts': trace_timestamp(), 'pid': getpid(), 'args': values})
+
+    def traced_items(self, name, iterable, **args):
+        '''Iterate over iterable, recording a span from the first item being asked for
+        until the last one has been produced, with the number of items.'''
+        if not self.tracing:
+            return iterable
+        return self._traced_items(name, iterable, args)
+
+    def _traced_items(self, name, iterable, args):
+        start = trace_timestamp()
+        num_items = 0
+        for item in iterable:
+            num_items += 1
+            yield item
+        self.span(name, start, trace_timestamp() - start, tid=INGEST_THREAD, items=num_items, **args)
+
+    def write_trace(self):
+        '''Write every span and counter to trace_file, naming the processes and threads they ran on.'''
+        main_pid = getpid()
+        metadata = [
+            {'name': 'process_name', 'ph': 'M', 'pid': main_pid, 'args': {'name': 'main'}},
+            {'name': 'thread_name', 'ph': 'M', 'pid': main_pid, 'tid': STAGE_THREAD, 'args': {'name': 'stages'}},
+            {'name': 'thread_name', 'ph': 'M', 'pid': main_pid, 'tid': INGEST_THREAD, 'args': {'name': 'ingest'}},
+        ]
+        worker_pids = sorted({e['pid'] for e in self.trace_events} - {main_pid})
+        for i, pid in enumerate(worker_pids):
+            metadata.append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'args': {'name': f'worker {i + 1}'}})
+        with open(self.trace_file, 'w') as f:
+            json.dump({'traceEvents': metadata + self.trace_events, 'displayTimeUnit': 'ms'}, f)
+
+    def print_report(self):
+        '''Print how long each stage took and write out the profile of each stage.'''
+        total = sum(r.seconds for r in self.records.values())
+        print("\nPROFILE\n=============================")
+        print(f"{'stage':<20}{'time (s)':>10}{'share':>8}" + (f"{'peak (MB)':>12}" if self.trace_memory else ''))
+        for record in self.records.values():
+            line = f"{record.name:<20}{record.seconds:>10.3f}{record.seconds / (total or 1):>8.0%}"
+            if self.trace_memory:
+                line += f"{record.peak_memory / 1024 / 1024:>12.1f}" if record.peak_memory is not None else f"{'-':>12}"
+            print(line)
+        print(f"{'total':<20}{total:>10.3f}")
+        print("=============================")
+        if self.profile_dir is not None:
+            makedirs(self.profile_dir, exist_ok=True)
+            for record in self.records.values():
+                record.profile.dump_stats(path.join(self.profile_dir, record.name + '.prof'))
+            print(f"cProfile stats for each stage written to {self.profile_dir}/<stage>.prof")
+        if self.tracing:
+            self.write_trace()
+            print(f"trace of the run written to {self.trace_file}")
+        print()
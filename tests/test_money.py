@@ -0,0 +1,74 @@
+'''Checks that the whole cent arithmetic of money.py always agrees with the Decimal arithmetic
+of process_shipment_v6.py'''
+
+import random
+import sys
+from decimal import Decimal, ROUND_HALF_UP
+from os import path
+import pytest
+
+sys.path.insert(0, path.dirname(path.dirname(path.realpath(__file__))))
+from money import NUMPY_MIN_BATCH_SIZE, parse_cents, paypal_fee_cents, total_paypal_fee_cents
+
+
+def legacy_paypal_fee_cents(price_cents):
+    '''The paypal fee calculation from process_shipment_v6.py, in cents.'''
+    retail_price = Decimal(price_cents) / 100
+    paypal_variable_fees_cents = Decimal(str(Decimal(0.0349) * retail_price * 100))
+    fee = Decimal(str((49 + paypal_variable_fees_cents) / 100)).quantize(Decimal('.01'), rounding=ROUND_HALF_UP)
+    return int(fee * 100)
+
+
+@pytest.mark.parametrize('amount, cents', [
+    ('15.00', 1500),
+    ('$1,024.5', 102450),
+    ('3', 300),
+    ('.5', 50),
+    ('24.999', 2499),
+    ('-2.50', -250),
+    (' $49.98 ', 4998),
+])
+def test_parse_cents(amount, cents):
+    assert parse_cents(amount) == cents
+    assert parse_cents(amount) == int(Decimal(amount.strip().lstrip('$').replace(',', '')) * 100)
+
+
+@pytest.mark.parametrize('amount', ['', '$', 'abc', '1.2.3', '15 00'])
+def test_parse_cents_rejects_text_that_isnt_money(amount):
+    with pytest.raises(ValueError):
+        parse_cents(amount)
+
+
+def test_parse_cents_matches_decimal():
+    rng = random.Random(0)
+    for _ in range(10000):
+        text = f'{rng.randrange(100000)}.{rng.randrange(100):0{rng.choice([1, 2])}d}'
+        assert parse_cents(text) == int(Decimal(text) * 100), text
+
+
+@pytest.mark.parametrize('price_cents, fee_cents', [
+    (0, 49),
+    (1500, 101),
+    # 3.49% of $50 and $150 is exactly half a cent past a whole cent, which rounds up
+    (5000, 224),
+    (15000, 573),
+])
+def test_paypal_fee_cents(price_cents, fee_cents):
+    assert paypal_fee_cents(price_cents) == fee_cents
+    assert legacy_paypal_fee_cents(price_cents) == fee_cents
+
+
+def test_paypal_fee_cents_matches_decimal():
+    # 3.49% of a price repeats its fraction of a cent every $100, so every price up to
+    # $100 covers every way that the fee can fall around half a cent
+    rng = random.Random(0)
+    prices_cents = list(range(10001)) + [rng.randrange(100000000) for _ in range(10000)]
+    for price_cents in prices_cents:
+        assert paypal_fee_cents(price_cents) == legacy_paypal_fee_cents(price_cents), price_cents
+
+
+@pytest.mark.parametrize('num_orders', [0, 1, NUMPY_MIN_BATCH_SIZE - 1, NUMPY_MIN_BATCH_SIZE, 10000])
+def test_total_paypal_fee_cents(num_orders):
+    rng = random.Random(num_orders)
+    prices_cents = [rng.choice([5000, 15000, rng.randrange(1000000)]) for _ in range(num_orders)]
+    assert total_paypal_fee_cents(prices_cents) == sum(legacy_paypal_fee_cents(p) for p in prices_cents)